@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""Measures the frontend's own overhead using stub backend tools.
+
+Runs without a GPU: Video2X, ffmpeg and ffprobe are replaced by
+stub_tool.py, which prints realistic progress output and writes dummy
+files. Results are written as JSON so runs can be compared across commits:
+
+    python benchmarks/bench.py -o before.json
+    python benchmarks/bench.py -o after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+# Replays recorded GPU and host load so the telemetry sampler runs as it
+# would on a GPU machine.
+os.environ.setdefault("C2X_TELEMETRY_FIXTURE", str(BENCH_DIR / "telemetry.jsonl"))
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import c2x  # noqa: E402
+from PySide6 import __version__ as pyside_version  # noqa: E402
+from PySide6.QtCore import QEventLoop, QSettings, QTimer, Qt  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+STUB = BENCH_DIR / "stub_tool.py"
+STUB_ENV = (
+    "C2X_STUB_FRAMES",
+    "C2X_STUB_RATE",
+    "C2X_STUB_CHUNK",
+    "C2X_STUB_NOISE",
+    "C2X_STUB_TRACE",
+)
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    return {
+        "median": statistics.median(values),
+        "p95": pick(0.95),
+        "max": values[-1],
+    }
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def wait_until(condition, timeout):
+    """Runs the event loop until condition() is true or timeout seconds pass."""
+    loop = QEventLoop()
+    deadline = time.monotonic() + timeout
+
+    def check():
+        if condition() or time.monotonic() > deadline:
+            loop.quit()
+
+    timer = QTimer()
+    timer.timeout.connect(check)
+    timer.start(2)
+    check()
+    if not condition():
+        loop.exec()
+    timer.stop()
+    if not condition():
+        raise TimeoutError(f"timed out after {timeout}s")
+
+
+class LoopLatency:
+    """Measures how late a short repeating timer fires while jobs run."""
+
+    def __init__(self, interval_ms=10):
+        self.interval = interval_ms / 1000
+        self.delays = []
+        self.last = None
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.timer.setInterval(interval_ms)
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.delays.append(max(0.0, now - self.last - self.interval) * 1000)
+        self.last = now
+
+    def stop(self):
+        self.timer.stop()
+        return percentiles(self.delays)
+
+
+class Bench:
+    def __init__(self, work_dir, options):
+        self.work = pathlib.Path(work_dir)
+        self.options = options
+        self.tools = self.work / "tools"
+        self.tools.mkdir()
+        for name in ("video2x", "ffmpeg", "ffprobe"):
+            wrapper = self.tools / name
+            wrapper.write_text(
+                "#!/bin/sh\n"
+                f'C2X_STUB_AS={name} exec "{sys.executable}" "{STUB}" "$@"\n'
+            )
+            wrapper.chmod(0o755)
+        self.trace = self.work / "trace.txt"
+
+    def stub_env(self, **values):
+        for name in STUB_ENV:
+            os.environ.pop(name, None)
+        os.environ["C2X_STUB_TRACE"] = str(self.trace)
+        for key, value in values.items():
+            os.environ[f"C2X_STUB_{key.upper()}"] = str(value)
+        self.trace.write_text("")
+
+    def read_trace(self, name="video2x"):
+        runs = []
+        for line in self.trace.read_text().splitlines():
+            tool, start, end = line.split()
+            if tool == name:
+                runs.append((float(start), float(end)))
+        return sorted(runs)
+
+    def make_inputs(self, count, tag):
+        folder = self.work / f"inputs-{tag}"
+        folder.mkdir()
+        files = []
+        for i in range(count):
+            path = folder / f"clip{i:04d}.mp4"
+            path.write_bytes(b"\0" * 1024)
+            files.append(str(path))
+        return files
+
+    def make_window(self, tag):
+        settings = QSettings(
+            str(self.work / f"settings-{tag}.ini"), QSettings.Format.IniFormat
+        )
+        settings.setValue("v2x-path", str(self.tools / "video2x"))
+        settings.setValue("ffmpeg-path", str(self.tools))
+        settings.setValue("log-folder", str(self.work / f"logs-{tag}"))
+        return c2x.MainWindow(settings=settings)
+
+    def run_batch(self, tag, files, timeout=600):
+        window = self.make_window(tag)
+        for path in files:
+            window.add_file_to_list(path)
+
+        def done():
+            return not (
+                window.runner.running
+                or window.file_queue
+                or window.urgent_queue
+                or window.pending_retries
+                or window.pending_moves
+                or window.pending_verifications
+            )
+
+        started = time.time()
+        window.on_run_clicked(None)
+        wait_until(done, timeout)
+        wall = time.time() - started
+        return window, started, wall
+
+    def close_window(self, window):
+        window.log_writer.stop()
+        window.close()
+        window.deleteLater()
+        QApplication.processEvents()
+
+    def spawn_latency(self):
+        """Time from asking for a process to the stub running, direct vs JobRunner."""
+        repeats = self.options.repeats
+        self.stub_env(frames=0)
+        program = str(self.tools / "video2x")
+
+        direct = []
+        for _ in range(repeats):
+            t0 = time.time()
+            subprocess.run([program], capture_output=True)
+            direct.append(self.read_trace()[-1][0] - t0)
+
+        runner = c2x.JobRunner()
+        finished = []
+        runner.job_finished.connect(finished.append)
+        env_map = dict(os.environ)
+        via_runner = []
+        for i in range(repeats):
+            t0 = time.time()
+            runner.start([("Stub", program, [])], env_map)
+            wait_until(lambda: len(finished) > i, 30)
+            via_runner.append(self.read_trace()[-1][0] - t0)
+
+        direct_ms = percentiles([d * 1000 for d in direct])
+        runner_ms = percentiles([d * 1000 for d in via_runner])
+        return {
+            "repeats": repeats,
+            "direct_ms": direct_ms,
+            "runner_ms": runner_ms,
+            "added_ms": runner_ms["median"] - direct_ms["median"],
+        }
+
+    def short_jobs(self):
+        """Many near-instant jobs, so the time between them is the frontend's."""
+        count = self.options.jobs
+        self.stub_env(frames=1)
+        files = self.make_inputs(count, "short")
+        window, started, wall = self.run_batch("short", files)
+        self.close_window(window)
+
+        runs = self.read_trace()
+        busy = sum(end - start for start, end in runs)
+        gaps = [b[0] - a[1] for a, b in zip(runs, runs[1:])]
+        return {
+            "jobs": count,
+            "completed": len(runs),
+            "wall_s": wall,
+            "jobs_per_s": len(runs) / wall if wall else 0,
+            "overhead_per_job_ms": (wall - busy) / max(len(runs), 1) * 1000,
+            "gap_ms": percentiles([g * 1000 for g in gaps]),
+            "backend_busy_fraction": busy / wall if wall else 0,
+        }
+
+    def batch_overhead(self):
+        """Realistic jobs printing steady progress; overhead on top of the backend."""
+        count = self.options.batch_jobs
+        frames = self.options.frames
+        self.stub_env(frames=frames, rate=self.options.rate, chunk=self.options.chunk)
+        files = self.make_inputs(count, "batch")
+        latency = LoopLatency()
+        latency.start()
+        window, started, wall = self.run_batch("batch", files)
+        loop_ms = latency.stop()
+        self.close_window(window)
+
+        runs = self.read_trace()
+        busy = sum(end - start for start, end in runs)
+        return {
+            "jobs": count,
+            "frames_per_job": frames,
+            "wall_s": wall,
+            "backend_s": busy,
+            "overhead_per_job_ms": (wall - busy) / max(len(runs), 1) * 1000,
+            "event_loop_delay_ms": loop_ms,
+        }
+
+    def log_handling(self):
+        """One long, chatty job; CPU and memory used by the frontend."""
+        seconds = self.options.long_seconds
+        rate = max(self.options.rate, 1)
+        self.stub_env(
+            frames=int(seconds * rate),
+            rate=rate,
+            chunk=self.options.chunk,
+            noise=self.options.noise,
+        )
+        files = self.make_inputs(1, "long")
+        rss = []
+        sampler = QTimer()
+        sampler.timeout.connect(lambda: rss.append(rss_bytes()))
+        sampler.start(250)
+        latency = LoopLatency()
+        latency.start()
+        rss_start = rss_bytes()
+        cpu_start = time.process_time()
+        window, started, wall = self.run_batch("long", files)
+        cpu = time.process_time() - cpu_start
+        loop_ms = latency.stop()
+        sampler.stop()
+
+        shown_chars = len(window.textview_output.toPlainText())
+        self.close_window(window)
+        log_bytes = sum(
+            p.stat().st_size for p in (self.work / "logs-long").glob("*") if p.is_file()
+        )
+        return {
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "cpu_percent": cpu / wall * 100 if wall else 0,
+            "rss_start_mb": rss_start / 2**20,
+            "rss_peak_mb": max(rss + [rss_start]) / 2**20,
+            "rss_end_mb": (rss[-1] if rss else rss_start) / 2**20,
+            "output_chars_shown": shown_chars,
+            "log_file_bytes": log_bytes,
+            "event_loop_delay_ms": loop_ms,
+        }
+
+    def progress_parse(self):
+        """Cost of feeding one chunk of backend output through the UI."""
+        chunk = self.options.chunk or 4096
+        calls = self.options.parse_calls
+        line = (
+            "\rProcessing frame 120/240 (50.00%); "
+            "time elapsed: 00:00:01; time remaining: 00:00:01"
+        )
+        text = (line * (chunk // len(line) + 1))[:chunk]
+
+        window = self.make_window("parse")
+        window.current_file = "clip.mp4"
+        window.watchdog.start_job(240)
+
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            window.progress_regex.findall(text)
+        regex_only = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            window.add_output_text(text)
+        full = time.perf_counter() - t0
+        window.current_file = None
+        self.close_window(window)
+
+        return {
+            "chunk_bytes": chunk,
+            "calls": calls,
+            "regex_us_per_chunk": regex_only / calls * 1e6,
+            "add_output_us_per_chunk": full / calls * 1e6,
+            "add_output_us_per_kb": full / calls * 1e6 / (chunk / 1024),
+        }
+
+
+SCENARIOS = {
+    "spawn_latency": Bench.spawn_latency,
+    "short_jobs": Bench.short_jobs,
+    "batch_overhead": Bench.batch_overhead,
+    "log_handling": Bench.log_handling,
+    "progress_parse": Bench.progress_parse,
+}
+
+
+def git_revision():
+    try:
+        head = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--", "c2x.py"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        return head, bool(dirty)
+    except OSError:
+        return "", False
+
+
+def flatten(results, prefix=""):
+    values = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def print_comparison(baseline, current):
+    old = flatten(baseline.get("results", {}))
+    new = flatten(current["results"])
+    print(f"{'metric':<48} {'before':>12} {'after':>12} {'change':>8}")
+    for name in sorted(new):
+        if name not in old:
+            continue
+        before, after = old[name], new[name]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else ""
+        print(f"{name:<48} {before:>12.3f} {after:>12.3f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument(
+        "--only", action="append", choices=sorted(SCENARIOS), help="scenario to run"
+    )
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--jobs", type=int, default=100, help="short jobs to run")
+    parser.add_argument("--batch-jobs", type=int, default=5)
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--rate", type=int, default=240, help="progress lines/s")
+    parser.add_argument("--chunk", type=int, default=0, help="bytes per write")
+    parser.add_argument("--noise", type=int, default=5, help="log lines per frame")
+    parser.add_argument("--long-seconds", type=float, default=30)
+    parser.add_argument("--parse-calls", type=int, default=2000)
+    options = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    if c2x.pyside_leaks_references():
+        sys.exit(c2x.PYSIDE_LEAK_ERROR)
+    revision, dirty = git_revision()
+    report = {
+        "meta": {
+            "revision": revision,
+            "dirty": dirty,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "pyside": pyside_version,
+            "platform": platform.platform(),
+            "options": {
+                k: v for k, v in vars(options).items() if k not in ("output", "compare")
+            },
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="c2x-bench-") as work_dir:
+        bench = Bench(work_dir, options)
+        for name, scenario in SCENARIOS.items():
+            if options.only and name not in options.only:
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            try:
+                report["results"][name] = scenario(bench)
+            except TimeoutError as e:
+                report["results"][name] = {"error": str(e)}
+
+    app.quit()
+    with open(options.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {options.output}", file=sys.stderr)
+
+    if options.compare:
+        with open(options.compare) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
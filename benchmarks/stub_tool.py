@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Stand-in for Video2X, ffmpeg and ffprobe used by the benchmarks.
+
+The tool it emulates is picked from the name it's run as. Behaviour is
+controlled with environment variables:
+
+    C2X_STUB_FRAMES   frames to "process" (default 240)
+    C2X_STUB_RATE     progress updates per second, 0 for no delay (default 0)
+    C2X_STUB_CHUNK    bytes per write to the output pipe, 0 to write each
+                      update as soon as it's made (default 0)
+    C2X_STUB_NOISE    extra log lines printed with each update (default 0)
+    C2X_STUB_TRACE    file to append "name start end" timings to
+    C2X_STUB_AS       tool to emulate, overriding the name it's run as
+"""
+
+import copy
+import json
+import os
+import re
+import sys
+import time
+
+STARTED = time.time()
+
+FFPROBE_INFO = {
+    "streams": [
+        {
+            "index": 0,
+            "codec_type": "video",
+            "width": 1440,
+            "height": 1080,
+            "avg_frame_rate": "24/1",
+            "nb_frames": "240",
+            "pix_fmt": "yuv420p",
+        },
+        {"index": 1, "codec_type": "audio"},
+    ],
+    "format": {"duration": "10.0"},
+}
+
+ENCODERS = """Encoders:
+ V..... = Video
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC
+ V....D h264_nvenc           NVIDIA NVENC H.264 encoder
+"""
+
+
+class ChunkedWriter:
+    """Buffers output and writes it to a pipe in fixed size chunks."""
+
+    def __init__(self, stream, chunk_size):
+        self.fd = stream.fileno()
+        self.chunk_size = chunk_size
+        self.buffer = b""
+
+    def write(self, text):
+        self.buffer += text.encode()
+        while len(self.buffer) >= max(self.chunk_size, 1):
+            size = self.chunk_size or len(self.buffer)
+            os.write(self.fd, self.buffer[:size])
+            self.buffer = self.buffer[size:]
+
+    def flush(self):
+        if self.buffer:
+            os.write(self.fd, self.buffer)
+            self.buffer = b""
+
+
+def env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def emit_progress(stream, line_for):
+    frames = env_int("C2X_STUB_FRAMES", 240)
+    rate = env_int("C2X_STUB_RATE", 0)
+    noise = env_int("C2X_STUB_NOISE", 0)
+    writer = ChunkedWriter(stream, env_int("C2X_STUB_CHUNK", 0))
+
+    for frame in range(1, frames + 1):
+        for i in range(noise):
+            writer.write(f"[info] frame {frame}: tile {i} processed\n")
+        writer.write(line_for(frame, frames))
+        if rate:
+            time.sleep(1 / rate)
+    writer.flush()
+
+
+def read_info(path):
+    """Returns the ffprobe info stored in a dummy file, or the default."""
+    try:
+        with open(path) as f:
+            info = json.load(f)
+    except (OSError, ValueError, UnicodeDecodeError):
+        return copy.deepcopy(FFPROBE_INFO)
+    return info if isinstance(info, dict) else copy.deepcopy(FFPROBE_INFO)
+
+
+def write_dummy(path, info):
+    """Writes a dummy output that the ffprobe stub reports as info."""
+    if path and path != "-" and not path.startswith("pipe:"):
+        with open(path, "w") as f:
+            json.dump(info, f)
+
+
+def option(args, name, default=None):
+    if name in args[:-1]:
+        return args[args.index(name) + 1]
+    return default
+
+
+def video2x(args):
+    def line_for(frame, frames):
+        return (
+            f"\rProcessing frame {frame}/{frames} ({frame * 100 / frames:.2f}%); "
+            f"time elapsed: 00:00:01; time remaining: 00:00:01"
+        )
+
+    emit_progress(sys.stdout, line_for)
+    sys.stdout.write("\n")
+
+    info = read_info(option(args, "-i", ""))
+    video = next(s for s in info["streams"] if s["codec_type"] == "video")
+    scale = int(option(args, "-s", 1))
+    factor = int(option(args, "-m", 1))
+    video["width"] *= scale
+    video["height"] *= scale
+    video["nb_frames"] = str(int(video["nb_frames"]) * factor)
+    num, _, den = video["avg_frame_rate"].partition("/")
+    video["avg_frame_rate"] = f"{int(num) * factor}/{den or 1}"
+    write_dummy(option(args, "-o"), info)
+    return 0
+
+
+def ffmpeg(args):
+    if "-encoders" in args:
+        sys.stdout.write(ENCODERS)
+        return 0
+    if "lavfi" in args:
+        return 1 if any("nvenc" in a for a in args) else 0
+
+    def line_for(frame, frames):
+        return (
+            f"frame={frame:5d} fps= 60 q=28.0 size=    1024kB "
+            f"time=00:00:{frame / 24:05.2f} bitrate=1000.0kbits/s speed=2.5x\r"
+        )
+
+    emit_progress(sys.stderr, line_for)
+    if args:
+        info = read_info(option(args, "-i", ""))
+        size = re.search(r"pad=(\d+):(\d+)", option(args, "-vf", ""))
+        if size:
+            video = next(s for s in info["streams"] if s["codec_type"] == "video")
+            video["width"], video["height"] = map(int, size.groups())
+        write_dummy(args[-1], info)
+    return 0
+
+
+def ffprobe(args):
+    info = read_info(args[-1] if args else "")
+    if "-count_packets" in args:
+        for stream in info.get("streams", []):
+            if "nb_frames" in stream:
+                stream["nb_read_packets"] = stream["nb_frames"]
+    sys.stdout.write(json.dumps(info))
+    return 0
+
+
+def main():
+    name = os.environ.get("C2X_STUB_AS") or os.path.basename(sys.argv[0])
+    if name.startswith("ffprobe"):
+        code = ffprobe(sys.argv[1:])
+    elif name.startswith("ffmpeg"):
+        code = ffmpeg(sys.argv[1:])
+    else:
+        code = video2x(sys.argv[1:])
+
+    trace = os.environ.get("C2X_STUB_TRACE")
+    if trace:
+        with open(trace, "a") as f:
+            f.write(f"{name} {STARTED:.6f} {time.time():.6f}\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
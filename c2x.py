@@ -6,9 +6,35 @@ import subprocess
 import pathlib
 import shutil
 import re
+import time
+import signal
+import math
+import json
+import tempfile
+import threading
+import functools
+import collections
+import queue
+import gzip
+import uuid
+import concurrent.futures
+import dataclasses
+import csv
+import hashlib
+import itertools
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
 from PySide6.QtCore import (
     Qt,
+    QObject,
+    Signal,
     QProcess,
+    QProcessEnvironment,
+    QTimer,
+    QStandardPaths,
     QSettings,
     QSize,
     QUrl,
@@ -308,6 +334,1906 @@ QStatusBar::item {
 """
 
 
+class _RefcountProbe(QObject):
+    fired = Signal(str)
+
+
+def pyside_leaks_references():
+    """Checks for PySide6 builds that drop a reference to True or None on
+    every signal emit, which aborts the interpreter a few hundred emits in."""
+    probe = _RefcountProbe()
+    before = sys.getrefcount(True), sys.getrefcount(None)
+    for _ in range(10):
+        probe.fired.emit("")
+    after = sys.getrefcount(True), sys.getrefcount(None)
+    return after[0] < before[0] or after[1] < before[1]
+
+
+PYSIDE_LEAK_ERROR = (
+    "Error: this PySide6 build drops references on every signal emit and "
+    "would crash partway through a batch. Install another PySide6 version."
+)
+
+
+def find_tool(ffmpeg_dir, name):
+    """Returns the path of an ffmpeg tool, preferring the configured folder."""
+    if ffmpeg_dir:
+        candidate = pathlib.Path(ffmpeg_dir) / name
+        if candidate.is_file():
+            return str(candidate)
+    return shutil.which(name) or name
+
+
+def parse_rate(rate_str):
+    """Converts an ffprobe rate such as '30000/1001' to a float."""
+    try:
+        num, _, den = rate_str.partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def encoder_args(encoder, encoder_opts):
+    """Turns the encoder settings into ffmpeg command line arguments."""
+    args = []
+    if encoder:
+        args.extend(["-c:v", encoder])
+    if encoder_opts:
+        for opt in encoder_opts.split(","):
+            key, _, value = opt.strip().partition("=")
+            if key:
+                args.extend([f"-{key}", value] if value else [f"-{key}"])
+    return args
+
+
+def run_ffprobe(ffprobe, path, count_frames=False, runner=None):
+    """Returns the parsed ffprobe format and stream info, or None on failure.
+
+    Pass the JobRunner when calling from a stage so the probe is paused and
+    stopped along with the job.
+    """
+    command = [ffprobe, "-v", "error", "-print_format", "json"]
+    if count_frames:
+        command.append("-count_packets")
+    command.extend(["-show_format", "-show_streams", path])
+
+    try:
+        if runner:
+            stdout = runner.run(command, timeout=300).stdout
+        else:
+            result = subprocess.run(
+                command, capture_output=True, text=True, timeout=300
+            )
+            stdout = result.stdout
+        return json.loads(stdout or "{}")
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def probe_video(ffprobe, path, count_frames=False, runner=None):
+    """Returns basic facts about a media file, or None if it can't be probed."""
+    info = run_ffprobe(ffprobe, path, count_frames, runner)
+    if info is None:
+        return None
+
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        return None
+
+    rate = video.get("avg_frame_rate", "0/0")
+    if parse_rate(rate) <= 0:
+        rate = video.get("r_frame_rate", "0/1")
+    fps = parse_rate(rate)
+    duration = float(
+        video.get("duration") or info.get("format", {}).get("duration") or 0
+    )
+    frames = int(video.get("nb_read_packets") or video.get("nb_frames") or 0)
+    # MKV and WebM don't store a frame count; estimate unless counting.
+    frames_exact = frames > 0
+    if not frames:
+        frames = int(round(duration * fps))
+
+    return {
+        "width": int(video.get("width", 0)),
+        "height": int(video.get("height", 0)),
+        "rate": rate,
+        "fps": fps,
+        "frames": frames,
+        "frames_exact": frames_exact,
+        "duration": duration,
+        "pix_fmt": video.get("pix_fmt", ""),
+        "audio_streams": sum(1 for s in streams if s.get("codec_type") == "audio"),
+        "subtitle_streams": sum(
+            1 for s in streams if s.get("codec_type") == "subtitle"
+        ),
+    }
+
+
+def raw_video_format(pix_fmt, width, height):
+    """Returns the planar YUV pixel format that keeps the chroma resolution
+    and bit depth of pix_fmt, and the size of one width x height frame in it."""
+    if (
+        "444" in pix_fmt
+        or "440" in pix_fmt
+        or pix_fmt.startswith(("rgb", "bgr", "gbr"))
+    ):
+        chroma, chroma_width, chroma_height = "444", width, height
+    elif "422" in pix_fmt:
+        chroma, chroma_width, chroma_height = "422", (width + 1) // 2, height
+    else:
+        chroma, chroma_width, chroma_height = "420", (width + 1) // 2, (height + 1) // 2
+
+    match = re.search(r"(\d+)[lb]e$", pix_fmt)
+    depth = int(match.group(1)) if match else 8
+    if depth <= 8:
+        depth_suffix, sample_bytes = "", 1
+    elif depth <= 10:
+        depth_suffix, sample_bytes = "10le", 2
+    elif depth <= 12:
+        depth_suffix, sample_bytes = "12le", 2
+    else:
+        depth_suffix, sample_bytes = "16le", 2
+
+    samples = width * height + 2 * chroma_width * chroma_height
+    return f"yuv{chroma}p{depth_suffix}", samples * sample_bytes
+
+
+def frame_runs(timestamps, fps, total_frames):
+    """Turns the timestamps of the frames kept by mpdecimate into repeat counts."""
+    if not timestamps:
+        return []
+
+    start = timestamps[0]
+    positions = []
+    for t in timestamps:
+        position = int(round((t - start) * fps))
+        if positions and position <= positions[-1]:
+            position = positions[-1] + 1
+        positions.append(position)
+
+    runs = []
+    for i, position in enumerate(positions):
+        if i + 1 < len(positions):
+            end = positions[i + 1]
+        else:
+            end = max(total_frames, position + 1)
+        runs.append(end - position)
+    return runs
+
+
+# Encoders tried when the configured one doesn't work on this host, fastest
+# first, each with a fast preset. VAAPI is left out because it needs hardware
+# frames, which Video2X doesn't hand to its encoder.
+ENCODER_PREFERENCES = [
+    ("h264_nvenc", "preset=p1,rc-lookahead=0"),
+    ("hevc_nvenc", "preset=p1"),
+    ("h264_qsv", "preset=veryfast"),
+    ("libx264", "preset=veryfast"),
+    ("libsvtav1", "preset=10"),
+]
+
+
+def list_encoders(ffmpeg, runner=None):
+    """Returns the names of the video encoders an ffmpeg binary was built with."""
+    command = [ffmpeg, "-hide_banner", "-encoders"]
+    try:
+        if runner:
+            result = runner.run(command, timeout=30)
+        else:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return set()
+
+    names = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0].startswith("V"):
+            if parts[1] != "=":
+                names.add(parts[1])
+    return names
+
+
+def test_encoder(ffmpeg, encoder, encoder_opts, runner=None):
+    """Encodes a few blank frames to check an encoder works on this host."""
+    command = [
+        ffmpeg,
+        "-hide_banner",
+        "-v",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        "color=c=black:s=256x256:d=0.2",
+        "-frames:v",
+        "3",
+        "-pix_fmt",
+        "yuv420p",
+        *encoder_args(encoder, encoder_opts),
+        "-f",
+        "null",
+        "-",
+    ]
+    try:
+        if runner:
+            result = runner.run(command, timeout=60)
+        else:
+            result = subprocess.run(command, capture_output=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+
+class EncoderSelector:
+    """Picks a working encoder for an ffmpeg binary.
+
+    Probe results are kept in the settings, keyed by the binary's path and
+    modification time, so each toolchain is only probed once.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.lock = threading.Lock()
+
+    def select(self, ffmpeg, preferred, preferred_opts, exclude=(), runner=None):
+        """Returns (encoder, options, note) for the first candidate that works.
+
+        Safe to call from a stage thread; pass the JobRunner so the probes are
+        paused and cancelled with the job.
+        """
+        with self.lock:
+            # QSettings objects can't be shared between threads.
+            settings = QSettings(self.settings.fileName(), self.settings.format())
+            return self._select(
+                settings, ffmpeg, preferred, preferred_opts, exclude, runner
+            )
+
+    def _select(self, settings, ffmpeg, preferred, preferred_opts, exclude, runner):
+        binary = shutil.which(ffmpeg) or ffmpeg
+        try:
+            binary = os.path.realpath(binary)
+            key = f"{binary}|{os.stat(binary).st_mtime_ns}"
+        except OSError:
+            return preferred, preferred_opts, "ffmpeg not found, encoder not probed"
+
+        try:
+            cache = json.loads(settings.value("encoder-cache", "") or "{}")
+        except ValueError:
+            cache = {}
+        entry = cache.get(key)
+        if entry is None:
+            cache = {k: v for k, v in cache.items() if not k.startswith(binary + "|")}
+            entry = {"listed": sorted(list_encoders(binary, runner)), "tested": {}}
+            if runner and runner.cancelled:
+                raise RuntimeError("Cancelled")
+            cache[key] = entry
+
+        candidates = []
+        if preferred:
+            candidates.append((preferred, preferred_opts))
+        candidates.extend(
+            e for e in ENCODER_PREFERENCES if e != (preferred, preferred_opts)
+        )
+
+        choice = None
+        for encoder, encoder_opts in candidates:
+            if encoder not in entry["listed"] or encoder in exclude:
+                continue
+            test_key = f"{encoder}|{encoder_opts}"
+            if test_key not in entry["tested"]:
+                entry["tested"][test_key] = test_encoder(
+                    binary, encoder, encoder_opts, runner
+                )
+            if runner and runner.cancelled:
+                # A killed probe says nothing about the encoder; don't cache it.
+                raise RuntimeError("Cancelled")
+            if entry["tested"][test_key]:
+                choice = (encoder, encoder_opts)
+                break
+
+        settings.setValue("encoder-cache", json.dumps(cache))
+
+        if choice is None:
+            return preferred, preferred_opts, "no working encoder found"
+        if preferred in exclude and choice[0] != preferred:
+            return choice[0], choice[1], f"'{preferred}' failed on this file"
+        if preferred and choice != (preferred, preferred_opts):
+            return choice[0], choice[1], f"'{preferred}' does not work here"
+        return choice[0], choice[1], ""
+
+
+# Output patterns that identify why a job failed, checked in order.
+FAILURE_PATTERNS = [
+    (
+        "oom",
+        re.compile(
+            r"out of (device |host )?memory|OUT_OF_(DEVICE|HOST)_MEMORY|bad_alloc"
+            r"|cannot allocate memory",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "model",
+        re.compile(
+            r"failed to (load|open) model|model.*not found"
+            r"|\.(param|bin)\b.*(not found|no such file)",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "decoder",
+        re.compile(
+            r"invalid data found when processing input|error while decoding"
+            r"|moov atom not found|could not find codec parameters"
+            r"|failed to open input|decoder.*(failed|error)",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "encoder",
+        re.compile(
+            r"unknown encoder|error initializing output stream"
+            r"|error while opening encoder|failed to (initialize|open) encoder"
+            r"|OpenEncodeSessionEx failed|no capable devices found"
+            r"|encoder.*(failed|error)",
+            re.IGNORECASE,
+        ),
+    ),
+]
+
+# What to do with each failure class: retry after a backoff, requeue with a
+# different device or encoder, or quarantine without further retries.
+FAILURE_POLICY = {
+    "oom": "degrade",
+    "encoder": "degrade",
+    "killed": "retry",
+    "stalled": "retry",
+    "unknown": "retry",
+    "decoder": "quarantine",
+    "model": "quarantine",
+    "input": "quarantine",
+    "verify": "retry",
+}
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 15
+
+
+class InputError(ValueError):
+    """A source file that can't be processed, as opposed to a setup problem."""
+
+
+def classify_failure(exit_code, crashed, output):
+    """Sorts a failed job into one of the FAILURE_POLICY classes."""
+    for name, pattern in FAILURE_PATTERNS:
+        if pattern.search(output):
+            return name
+    if crashed or exit_code in (137, 143) or (exit_code or 0) < 0:
+        return "killed"
+    return "unknown"
+
+
+MODE_NAMES = {"upscale": 0, "stabilize": 1, "upscale+stabilize": 2}
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class JobSpec:
+    """The parameters of one job, fixed when it's queued.
+
+    scale and factor are the upscale scale and RIFE factor of whichever mode
+    the job runs in. A target width and height of 0 means no target, and an
+    empty output_file means a name is generated in output_folder, or next to
+    the input when that's empty too.
+    """
+
+    input_file: str
+    mode: int = 0
+    output_file: str = ""
+    output_folder: str = ""
+    model: str = "realcugan"
+    realcugan_model: str = ""
+    backend: str = "gpu"
+    scale: int = 2
+    rife_model: str = "rife-v4.6"
+    factor: int = 2
+    target_width: int = 0
+    target_height: int = 0
+    dedup: bool = False
+    encoder: str = ""
+    encoder_opts: str = ""
+    stream_passthrough: bool = False
+
+
+SPEC_FIELDS = {f.name: f.type for f in dataclasses.fields(JobSpec)}
+MANIFEST_FILTER = "Manifests (*.json *.jsonl *.csv *.toml)"
+# Jobs queued per event loop pass while a manifest loads.
+MANIFEST_CHUNK = 500
+
+
+def spec_from_entry(base, entry):
+    """Returns base with the overrides in a manifest entry applied."""
+    overrides = {}
+    for key, value in entry.items():
+        if key not in SPEC_FIELDS:
+            raise ValueError(f"unknown field '{key}'")
+        if value is None or value == "":
+            continue
+        kind = SPEC_FIELDS[key]
+        if key == "mode" and isinstance(value, str) and not value.isdigit():
+            if value.lower() not in MODE_NAMES:
+                raise ValueError(f"unknown mode '{value}'")
+            value = MODE_NAMES[value.lower()]
+        elif kind is bool and isinstance(value, str):
+            value = value.strip().lower() in ("1", "true", "yes", "on")
+        elif kind is int:
+            value = int(value)
+        elif kind is str:
+            value = str(value)
+        overrides[key] = value
+
+    if not overrides.get("input_file", base.input_file):
+        raise ValueError("no input_file")
+    return dataclasses.replace(base, **overrides)
+
+
+def spec_entry(spec):
+    """Returns a manifest entry holding every field of a spec."""
+    entry = dataclasses.asdict(spec)
+    names = {mode: name for name, mode in MODE_NAMES.items()}
+    entry["mode"] = names.get(spec.mode, spec.mode)
+    return entry
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Yields the items of a top-level JSON list without reading it all first."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("a JSON manifest must be a list of jobs")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                continue
+        elif eof:
+            raise ValueError("manifest ends before the list is closed")
+
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def read_manifest(path):
+    """Yields the entries of a JSON, JSON Lines, CSV or TOML manifest.
+
+    Everything but TOML is read as it's consumed, so the first jobs of a
+    huge manifest can start before the rest is parsed.
+    """
+    suffix = pathlib.Path(path).suffix.lower()
+    if suffix == ".toml":
+        if tomllib is None:
+            raise ValueError("TOML manifests need Python 3.11 or newer")
+        with open(path, "rb") as f:
+            yield from tomllib.load(f).get("jobs", [])
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif suffix == ".csv":
+            yield from csv.DictReader(f)
+        elif suffix == ".json":
+            yield from iter_json_array(f)
+        else:
+            raise ValueError(f"unsupported manifest type '{suffix}'")
+
+
+def toml_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    return json.dumps(str(value))
+
+
+def write_manifest(path, specs):
+    """Writes specs to a manifest, choosing the format from the file name."""
+    suffix = pathlib.Path(path).suffix.lower()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if suffix == ".csv":
+            writer = csv.DictWriter(f, fieldnames=list(SPEC_FIELDS))
+            writer.writeheader()
+            for spec in specs:
+                writer.writerow(spec_entry(spec))
+        elif suffix == ".toml":
+            for spec in specs:
+                f.write("[[jobs]]\n")
+                for key, value in spec_entry(spec).items():
+                    f.write(f"{key} = {toml_value(value)}\n")
+                f.write("\n")
+        elif suffix == ".jsonl":
+            for spec in specs:
+                f.write(json.dumps(spec_entry(spec)) + "\n")
+        else:
+            f.write("[\n")
+            for i, spec in enumerate(specs):
+                f.write(("" if i == 0 else ",\n") + json.dumps(spec_entry(spec)))
+            f.write("\n]\n")
+
+
+class JobRecord:
+    """What happened to one input file during a batch."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.input_file = spec.input_file
+        self.output_file = None
+        self.mode = spec.mode
+        self.status = "queued"
+        self.encoder = ""
+        self.encoder_opts = ""
+        self.device = "0"
+        self.attempts = 0
+        self.failure = ""
+        self.tried_devices = []
+        self.excluded_encoders = []
+        self.urgent = False
+        self.batch_id = 0
+        self.user_paused = False
+        self.total_frames = 0
+        self.source_info = None
+        self.log_path = ""
+        self.staged_output = ""
+        self.telemetry = []
+        self.started = None
+        self.ended = None
+        self.events = []
+
+    def log(self, message):
+        self.events.append((time.time(), message))
+
+    def details(self):
+        lines = [
+            f"Input: {self.input_file}",
+            f"Output: {self.output_file}",
+            f"Status: {self.status}",
+            f"Attempts: {self.attempts}",
+        ]
+        if self.failure:
+            lines.append(f"Last failure: {self.failure}")
+        if self.encoder:
+            lines.append(f"Encoder: {self.encoder} ({self.encoder_opts or 'defaults'})")
+        if self.started and self.ended:
+            lines.append(f"Duration: {self.ended - self.started:.1f}s")
+        lines.extend(summarize_telemetry(self.telemetry, self.device))
+        if self.log_path:
+            if not os.path.exists(self.log_path) and os.path.exists(
+                self.log_path + ".gz"
+            ):
+                lines.append(f"Log: {self.log_path}.gz")
+            else:
+                lines.append(f"Log: {self.log_path}")
+        for timestamp, message in self.events:
+            stamp = time.strftime("%H:%M:%S", time.localtime(timestamp))
+            lines.append(f"[{stamp}] {message}")
+        return "\n".join(lines)
+
+
+# Rough GPU cost of each processor per input pixel, relative to one RIFE frame.
+# Real-CUGAN runs its network on the input resolution, so its cost grows
+# slowly with the scale while RIFE pays for every pixel of the frames it sees.
+UPSCALE_PIXEL_COST = {1: 6.0, 2: 6.0, 3: 7.0, 4: 8.0}
+RIFE_PIXEL_COST = 1.0
+
+
+def plan_chain_order(scale, factor):
+    """Returns the order of the upscale and interpolate stages that needs the
+    least GPU work for one source frame of unit size."""
+    upscale_cost = UPSCALE_PIXEL_COST.get(scale, float(scale * 2))
+    new_frames = factor - 1
+
+    interpolate_first = RIFE_PIXEL_COST * new_frames + upscale_cost * factor
+    upscale_first = upscale_cost + RIFE_PIXEL_COST * scale * scale * new_frames
+    if interpolate_first < upscale_first:
+        return ["interpolate", "upscale"]
+    return ["upscale", "interpolate"]
+
+
+def target_scale(width, height, target_width, target_height, max_scale=4):
+    """Returns the smallest integer upscale factor that fills the target size
+    along at least one axis while keeping the aspect ratio."""
+    needed = min(target_width / width, target_height / height)
+    return max(1, min(max_scale, math.ceil(needed - 1e-6)))
+
+
+def resize_filter(target_width, target_height):
+    """Returns an ffmpeg filter that fits a video into the target size."""
+    return (
+        f"scale={target_width}:{target_height}:force_original_aspect_ratio=decrease"
+        f":flags=lanczos,pad={target_width}:{target_height}:(ow-iw)/2:(oh-ih)/2"
+    )
+
+
+# Stream maps used when the source is the second ffmpeg input and only its
+# audio is carried over.
+DEFAULT_STREAM_MAPS = ["-map", "1:a?", "-c:a", "copy"]
+
+MP4_SUFFIXES = [".mp4", ".m4v", ".mov"]
+
+
+def passthrough_maps(ffprobe, source, output, runner=None):
+    """Returns ffmpeg arguments that stream copy the audio, subtitle and
+    attachment streams, chapters and metadata of the source, which must be
+    the second ffmpeg input, and the number of streams that had to be left
+    out because the output container can't hold them."""
+    info = run_ffprobe(ffprobe, source, runner=runner)
+    if info is None:
+        raise InputError(f"Could not probe '{source}'")
+
+    mp4_output = pathlib.Path(output).suffix.lower() in MP4_SUFFIXES
+    maps = []
+    skipped = 0
+    for stream in info.get("streams", []):
+        kind = stream.get("codec_type")
+        if kind == "audio":
+            keep = True
+        elif kind == "subtitle":
+            keep = not mp4_output or stream.get("codec_name") == "mov_text"
+        elif kind == "attachment":
+            keep = not mp4_output
+        else:
+            continue
+
+        if keep:
+            maps.extend(["-map", f"1:{stream['index']}"])
+        else:
+            skipped += 1
+
+    maps.extend(["-c:a", "copy", "-c:s", "copy", "-c:t", "copy"])
+    maps.extend(["-map_metadata", "1", "-map_chapters", "1"])
+    return maps, skipped
+
+
+def final_encode_args(video_path, source, output, encode_args, stream_maps=None):
+    """Returns ffmpeg arguments that encode an intermediate video into the
+    final output, taking the other streams from the original source."""
+    return [
+        "-hide_banner",
+        "-y",
+        "-i",
+        video_path,
+        "-i",
+        source,
+        "-map",
+        "0:v",
+        *(stream_maps or DEFAULT_STREAM_MAPS),
+        *encode_args,
+        output,
+    ]
+
+
+def remux_args(video_path, source, output, stream_maps):
+    """Returns ffmpeg arguments that combine the processed video with the
+    source streams without re-encoding anything."""
+    return [
+        "-hide_banner",
+        "-y",
+        "-i",
+        video_path,
+        "-i",
+        source,
+        "-map",
+        "0:v",
+        *stream_maps,
+        "-c:v",
+        "copy",
+        output,
+    ]
+
+
+class DuplicateFramePass:
+    """Drops duplicate frames before upscaling and restores the timing after."""
+
+    def __init__(self, ffmpeg, ffprobe, source, scratch_dir):
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self.source = source
+        self.unique_path = str(pathlib.Path(scratch_dir) / "unique.mkv")
+        self.upscaled_path = str(pathlib.Path(scratch_dir) / "upscaled.mkv")
+        self.source_info = None
+        self.runs = []
+
+    def decimate_args(self):
+        return [
+            "-hide_banner",
+            "-y",
+            "-i",
+            self.source,
+            "-map",
+            "0:v:0",
+            "-vf",
+            "mpdecimate",
+            "-fps_mode",
+            "vfr",
+            "-c:v",
+            "ffv1",
+            "-an",
+            self.unique_path,
+        ]
+
+    def analyse(self, runner):
+        self.source_info = probe_video(
+            self.ffprobe, self.source, count_frames=True, runner=runner
+        )
+        if not self.source_info:
+            raise RuntimeError(f"Could not probe '{self.source}'")
+
+        result = runner.run(
+            [
+                self.ffprobe,
+                "-v",
+                "error",
+                "-select_streams",
+                "v:0",
+                "-show_entries",
+                "packet=pts_time",
+                "-of",
+                "csv=p=0",
+                self.unique_path,
+            ],
+            timeout=300,
+        )
+        timestamps = []
+        for line in result.stdout.splitlines():
+            try:
+                timestamps.append(float(line.strip().rstrip(",")))
+            except ValueError:
+                continue
+        timestamps.sort()
+        if not timestamps:
+            raise RuntimeError("Duplicate frame pass produced no frames")
+
+        total = self.source_info["frames"]
+        self.runs = frame_runs(timestamps, self.source_info["fps"], total)
+        saved = max(0, total - len(self.runs))
+        percent = 100.0 * saved / total if total else 0.0
+        runner.log(
+            f"Duplicate frame pass: {len(self.runs)} unique of {total} frames, "
+            f"{saved} frames skipped ({percent:.1f}% saved)\n"
+        )
+
+    def restore(self, runner, output, encode_args, stream_maps=None):
+        info = probe_video(self.ffprobe, self.upscaled_path, runner=runner)
+        if not info:
+            raise RuntimeError(f"Could not probe '{self.upscaled_path}'")
+
+        pix_fmt, frame_size = raw_video_format(
+            self.source_info["pix_fmt"], info["width"], info["height"]
+        )
+        width, height = info["width"], info["height"]
+
+        decoder = subprocess.Popen(
+            [
+                self.ffmpeg,
+                "-v",
+                "error",
+                "-i",
+                self.upscaled_path,
+                "-map",
+                "0:v:0",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                pix_fmt,
+                "-",
+            ],
+            stdout=subprocess.PIPE,
+            env=runner.env_map,
+            start_new_session=True,
+        )
+        encoder_log = tempfile.TemporaryFile()
+        encoder = subprocess.Popen(
+            [
+                self.ffmpeg,
+                "-v",
+                "error",
+                "-y",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                pix_fmt,
+                "-s",
+                f"{width}x{height}",
+                "-r",
+                self.source_info["rate"],
+                "-i",
+                "-",
+                "-i",
+                self.source,
+                "-map",
+                "0:v",
+                *(stream_maps or DEFAULT_STREAM_MAPS),
+                *encode_args,
+                output,
+            ],
+            stdin=subprocess.PIPE,
+            stderr=encoder_log,
+            env=runner.env_map,
+            start_new_session=True,
+        )
+        runner.children.extend([decoder, encoder])
+
+        total = sum(self.runs)
+        written = 0
+        next_report = 0
+        try:
+            for repeat in self.runs:
+                if runner.cancelled:
+                    break
+                frame = decoder.stdout.read(frame_size)
+                if len(frame) < frame_size:
+                    break
+                for _ in range(repeat):
+                    encoder.stdin.write(frame)
+                written += repeat
+                if written >= next_report:
+                    runner.log(
+                        f"Restoring timing: {written}/{total} frames "
+                        f"({100.0 * written / total:.1f}%)\n"
+                    )
+                    next_report = written + max(1, total // 50)
+        except BrokenPipeError:
+            pass
+        finally:
+            encoder.stdin.close()
+            decoder.stdout.close()
+            decoder.wait()
+            encoder.wait()
+            runner.children.remove(decoder)
+            runner.children.remove(encoder)
+            encoder_log.seek(0)
+            errors = encoder_log.read().decode("utf-8", errors="ignore")
+            encoder_log.close()
+
+        if errors:
+            runner.log(errors, backend=True)
+        if runner.cancelled:
+            raise RuntimeError("Cancelled")
+        if encoder.returncode != 0:
+            raise RuntimeError(f"Encoder exited with code {encoder.returncode}")
+        if written < total:
+            raise RuntimeError(f"Only {written} of {total} frames were restored")
+
+
+LOG_FLUSH_INTERVAL = 0.5
+LOG_FILE_MAX_BYTES = 20 * 1024 * 1024
+LOG_FOLDER_MAX_BYTES = 500 * 1024 * 1024
+LOG_KEEP_PLAIN = 20
+
+
+def compress_file(path, target):
+    with open(path, "rb") as source, gzip.open(target, "wb") as compressed:
+        shutil.copyfileobj(source, compressed)
+    os.remove(path)
+
+
+class LogWriter:
+    """Writes job logs to disk on a background thread.
+
+    Text is queued by write() and written in batches every
+    LOG_FLUSH_INTERVAL seconds, so callers never wait on the disk. A log
+    over LOG_FILE_MAX_BYTES is rotated into a numbered .gz file. When a log
+    is closed, all but the newest LOG_KEEP_PLAIN logs are compressed and the
+    oldest files are removed to keep the folder under LOG_FOLDER_MAX_BYTES.
+    """
+
+    def __init__(self, folder):
+        self.folder = pathlib.Path(folder)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def new_log(self, input_file):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = re.sub(r"[^\w.-]+", "_", pathlib.Path(input_file).stem)[:80]
+        return str(self.folder / f"{stamp}-{name}.log")
+
+    def write(self, path, text):
+        self.queue.put((path, text))
+
+    def close(self, path):
+        self.queue.put((path, None))
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def _run(self):
+        files = {}
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while batch[-1] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            closed = False
+            for entry in batch:
+                if entry is None:
+                    running = False
+                    continue
+                path, text = entry
+                try:
+                    if text is None:
+                        if path in files:
+                            files.pop(path).close()
+                        closed = True
+                        continue
+
+                    handle = files.get(path)
+                    if handle is None:
+                        self.folder.mkdir(parents=True, exist_ok=True)
+                        handle = files[path] = open(path, "a", encoding="utf-8")
+                    handle.write(text)
+                    if handle.tell() > LOG_FILE_MAX_BYTES:
+                        files.pop(path).close()
+                        self._rotate(path)
+                except OSError as e:
+                    print(f"Log write error: {e}")
+
+            for handle in files.values():
+                try:
+                    handle.flush()
+                except OSError as e:
+                    print(f"Log write error: {e}")
+            if closed:
+                self._clean_up(set(files))
+
+        for handle in files.values():
+            handle.close()
+
+    def _rotate(self, path):
+        index = 1
+        while os.path.exists(f"{path}.{index}.gz"):
+            index += 1
+        compress_file(path, f"{path}.{index}.gz")
+
+    def _clean_up(self, open_paths):
+        try:
+            entries = sorted(
+                (p for p in self.folder.iterdir() if p.is_file()),
+                key=lambda p: p.stat().st_mtime,
+                reverse=True,
+            )
+            plain = [p for p in entries if p.suffix == ".log"]
+            for path in plain[LOG_KEEP_PLAIN:]:
+                if str(path) not in open_paths:
+                    compress_file(path, f"{path}.gz")
+
+            entries = sorted(
+                (p for p in self.folder.iterdir() if p.is_file()),
+                key=lambda p: p.stat().st_mtime,
+            )
+            total = sum(p.stat().st_size for p in entries)
+            for path in entries:
+                if total <= LOG_FOLDER_MAX_BYTES:
+                    break
+                if str(path) in open_paths:
+                    continue
+                total -= path.stat().st_size
+                path.unlink()
+        except OSError as e:
+            print(f"Log clean up error: {e}")
+
+
+class ScratchStaging(QObject):
+    """Stages job files on fast local scratch storage.
+
+    Upcoming inputs are copied into the scratch folder on worker threads
+    while the current job runs. Outputs and intermediates are written to
+    scratch and moved back to their destination in the background, through a
+    temporary file and an atomic rename. Everything in the folder counts
+    towards max_bytes; to make room, copies left by earlier sessions go
+    first, then staged inputs least recently used first, except ones still
+    to be used. When that isn't enough, prefetching stops.
+    """
+
+    output_moved = Signal(object, str)
+
+    def __init__(self, folder, max_bytes, parent=None):
+        super().__init__(parent)
+        self.folder = pathlib.Path(folder)
+        self.max_bytes = max_bytes
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self.lock = threading.Lock()
+        self.staged = collections.OrderedDict()
+        self.pending = {}
+        self.in_use = set()
+        self.leftovers = []
+        self.rescan()
+
+    def rescan(self):
+        """Picks up input copies left behind by earlier sessions."""
+        with self.lock:
+            self.leftovers = []
+            try:
+                entries = list((self.folder / "inputs").iterdir())
+            except OSError:
+                return
+            known = {path for path, _ in self.staged.values()}
+            for entry in entries:
+                if str(entry) in known:
+                    continue
+                try:
+                    self.leftovers.append((str(entry), entry.stat().st_size))
+                except OSError:
+                    pass
+
+    def used_bytes(self):
+        inputs = sum(size for _, size in self.staged.values())
+        inputs += sum(size for _, size in self.leftovers)
+        inputs += sum(self.pending.values())
+        outputs = 0
+        for root, _, files in os.walk(self.folder / "outputs"):
+            for name in files:
+                try:
+                    outputs += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return inputs + outputs
+
+    def prefetch(self, sources):
+        """Stages the given upcoming inputs, in the order they'll be used."""
+        with self.lock:
+            for source in sources:
+                if source in self.staged or source in self.pending:
+                    continue
+                try:
+                    size = os.path.getsize(source)
+                except OSError:
+                    continue
+                if not self._make_room(size, keep=sources):
+                    break
+                self.pending[source] = size
+                self.pool.submit(self._copy_in, source, size)
+
+    def _make_room(self, size, keep):
+        excess = self.used_bytes() + size - self.max_bytes
+        while excess > 0 and self.leftovers:
+            path, leftover_size = self.leftovers.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            excess -= leftover_size
+        for source in list(self.staged):
+            if excess <= 0:
+                break
+            if source in self.in_use or source in keep:
+                continue
+            staged_path, staged_size = self.staged.pop(source)
+            try:
+                os.remove(staged_path)
+            except OSError:
+                pass
+            excess -= staged_size
+        return excess <= 0
+
+    def _copy_in(self, source, size):
+        target_dir = self.folder / "inputs"
+        target = target_dir / f"{uuid.uuid4().hex[:8]}-{pathlib.Path(source).name}"
+        partial = target.with_name(target.name + ".partial")
+        try:
+            target_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source, partial)
+            os.replace(partial, target)
+        except OSError as e:
+            print(f"Staging error for {source}: {e}")
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            with self.lock:
+                self.pending.pop(source, None)
+            return
+
+        with self.lock:
+            self.pending.pop(source, None)
+            self.staged[source] = (str(target), size)
+
+    def input_for(self, source):
+        """Returns the staged copy of an input if it's ready, else the source."""
+        with self.lock:
+            if source not in self.staged:
+                return source
+            self.staged.move_to_end(source)
+            self.in_use.add(source)
+            return self.staged[source][0]
+
+    def release(self, source):
+        with self.lock:
+            self.in_use.discard(source)
+
+    def output_path(self, final_output):
+        output_dir = self.folder / "outputs" / uuid.uuid4().hex[:8]
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return str(output_dir / pathlib.Path(final_output).name)
+
+    def move_back(self, job, scratch_output, final_output):
+        self.pool.submit(self._move_out, job, scratch_output, final_output)
+
+    def _move_out(self, job, scratch_output, final_output):
+        final = pathlib.Path(final_output)
+        partial = final.with_name(f".{final.name}.partial")
+        try:
+            shutil.copyfile(scratch_output, partial)
+            os.replace(partial, final)
+        except OSError as e:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            self.output_moved.emit(job, str(e))
+            return
+
+        shutil.rmtree(pathlib.Path(scratch_output).parent, ignore_errors=True)
+        self.output_moved.emit(job, "")
+
+
+THUMBNAIL_WIDTH = 160
+# Item data role holding the facts shown in a batch list row.
+PREVIEW_ROLE = Qt.ItemDataRole.UserRole + 1
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Previews kept in memory, most recently used last.
+THUMBNAIL_MEMORY_ITEMS = 2000
+
+
+def format_facts(info):
+    """Returns a one-line summary of probe_video() results for a list row."""
+    seconds = int(info["duration"])
+    duration = f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    fps = f"{info['fps']:.3f}".rstrip("0").rstrip(".")
+    return f"{info['width']}x{info['height']} · {duration} · {fps} fps"
+
+
+class ThumbnailCache(QObject):
+    """Extracts thumbnails and probe facts for the batch lists.
+
+    Work runs on a small thread pool and only for the files asked for, and
+    requests for rows that scrolled out of view are dropped before they
+    start. Results are stored on disk under a key made from the path, size
+    and modification time, and the least recently used entries are removed
+    once the cache grows past THUMBNAIL_CACHE_MAX_BYTES.
+    """
+
+    ready = Signal(str, str, object)
+
+    def __init__(self, folder, parent=None):
+        super().__init__(parent)
+        self.folder = pathlib.Path(folder)
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+        self.pending = {}
+        self.writes = 0
+        self.ready.connect(lambda path, *_: self.pending.pop(path, None))
+
+    def request(self, path, ffmpeg, ffprobe):
+        if path not in self.pending:
+            self.pending[path] = self.pool.submit(self._load, path, ffmpeg, ffprobe)
+
+    def keep_only(self, paths):
+        """Drops queued requests for files that aren't in paths."""
+        for path in list(self.pending):
+            if path not in paths and self.pending[path].cancel():
+                del self.pending[path]
+
+    def cache_key(self, path):
+        stat = os.stat(path)
+        key = f"{os.path.realpath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _load(self, path, ffmpeg, ffprobe):
+        try:
+            image, info = self._cached(path) or self._extract(path, ffmpeg, ffprobe)
+        except Exception as e:
+            print(f"Thumbnail error for {path}: {e}")
+            image, info = "", None
+        self.ready.emit(path, image, info)
+
+    def _cached(self, path):
+        base = self.folder / self.cache_key(path)
+        try:
+            with open(f"{base}.json") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        image = f"{base}.jpg"
+        for cached in (f"{base}.json", image):
+            try:
+                os.utime(cached)
+            except OSError:
+                pass
+        return (image if os.path.exists(image) else ""), info
+
+    def _extract(self, path, ffmpeg, ffprobe):
+        info = probe_video(ffprobe, path)
+        if info is None:
+            return "", None
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        base = self.folder / self.cache_key(path)
+        image = f"{base}.jpg"
+        partial = f"{base}.partial.jpg"
+        result = subprocess.run(
+            [
+                ffmpeg,
+                "-v",
+                "error",
+                "-y",
+                "-ss",
+                f"{info['duration'] * 0.1:.3f}",
+                "-i",
+                path,
+                "-frames:v",
+                "1",
+                "-vf",
+                f"scale={THUMBNAIL_WIDTH}:-2",
+                partial,
+            ],
+            capture_output=True,
+            timeout=60,
+        )
+        if result.returncode == 0 and os.path.exists(partial):
+            os.replace(partial, image)
+        else:
+            image = ""
+
+        with open(f"{base}.json", "w") as f:
+            json.dump(info, f)
+
+        self.writes += 1
+        if self.writes % 50 == 1:
+            self._evict()
+        return image, info
+
+    def _evict(self):
+        entries = []
+        for entry in self.folder.iterdir():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= THUMBNAIL_CACHE_MAX_BYTES:
+                break
+            try:
+                entry.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+VERIFY_WORKERS = 2
+
+
+def expected_output(spec, source):
+    """Returns the width, height and frame count an output of spec should have,
+    given probe_video() results for its source."""
+    width, height, frames = source["width"], source["height"], source["frames"]
+    if spec.mode in (0, 2):
+        width, height = width * spec.scale, height * spec.scale
+    if spec.mode == 0 and spec.target_width and spec.target_height:
+        width, height = spec.target_width, spec.target_height
+    if spec.mode in (1, 2):
+        frames *= spec.factor
+    return width, height, frames
+
+
+def verify_output(ffprobe, spec, source, output_path):
+    """Returns a list of the ways an output doesn't match its source, given
+    probe_video() results for the source. Frames are counted in the output,
+    so the source's frame count should be exact too."""
+    output = probe_video(ffprobe, output_path, count_frames=True)
+    if output is None:
+        return ["output can't be read as a video"]
+    if source is None:
+        return []
+
+    problems = []
+    width, height, frames = expected_output(spec, source)
+    if (output["width"], output["height"]) != (width, height):
+        problems.append(
+            f"resolution {output['width']}x{output['height']}, "
+            f"expected {width}x{height}"
+        )
+
+    factor = spec.factor if spec.mode in (1, 2) else 1
+    if frames and abs(output["frames"] - frames) > max(2 * factor, frames * 0.01):
+        problems.append(f"{output['frames']} frames, expected about {frames}")
+
+    duration = source["duration"]
+    if duration and abs(output["duration"] - duration) > max(0.5, duration * 0.01):
+        problems.append(f"duration {output['duration']:.2f}s, expected {duration:.2f}s")
+
+    if output["audio_streams"] != source["audio_streams"]:
+        problems.append(
+            f"{output['audio_streams']} audio stream(s), "
+            f"expected {source['audio_streams']}"
+        )
+    return problems
+
+
+class OutputVerifier(QObject):
+    """Checks finished outputs against their sources on a thread pool."""
+
+    verified = Signal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=VERIFY_WORKERS)
+
+    def verify(self, job, ffprobe):
+        self.pool.submit(self._verify, job, ffprobe)
+
+    def _verify(self, job, ffprobe):
+        try:
+            source = job.source_info
+            if not source or not source["frames_exact"]:
+                source = probe_video(ffprobe, job.input_file, count_frames=True)
+            problems = verify_output(ffprobe, job.spec, source, job.output_file)
+        except Exception as e:
+            problems = [f"verification error: {e}"]
+        self.verified.emit(job, problems)
+
+
+TELEMETRY_INTERVAL = 2.0
+# Samples kept in memory, a bit over two hours at the default interval.
+TELEMETRY_BUFFER = 4096
+NVIDIA_SMI_FIELDS = (
+    "count",
+    "index",
+    "utilization.gpu",
+    "memory.used",
+    "memory.total",
+    "utilization.encoder",
+    "utilization.decoder",
+)
+GPU_STAT_KEYS = ("util", "mem_used", "mem_total", "enc", "dec")
+
+
+def parse_nvidia_smi_line(line):
+    """Returns (gpu count, index, stats) for a line of nvidia-smi CSV output."""
+    parts = [part.strip() for part in line.split(",")]
+    if len(parts) != len(NVIDIA_SMI_FIELDS) or not parts[0].isdigit():
+        return None
+
+    def number(value):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    return int(parts[0]), parts[1], dict(zip(GPU_STAT_KEYS, map(number, parts[2:])))
+
+
+def read_cpu_times():
+    """Returns (total, idle, iowait) jiffies from /proc/stat, or None."""
+    try:
+        with open("/proc/stat") as f:
+            values = [int(v) for v in f.readline().split()[1:9]]
+    except (OSError, ValueError):
+        return None
+    if len(values) < 5:
+        return None
+    return sum(values), values[3], values[4]
+
+
+def summarize_telemetry(samples, device):
+    """Returns lines describing the load seen during a job."""
+
+    def average(rows, key):
+        values = [row[key] for row in rows if row.get(key) is not None]
+        return (sum(values) / len(values), max(values)) if values else (None, None)
+
+    lines = []
+    gpu = [s["devices"][device] for s in samples if device in s.get("devices", {})]
+    util, peak = average(gpu, "util")
+    if util is not None:
+        line = f"GPU {device} averaged {util:.0f}% (peak {peak:.0f}%)"
+        encoder, _ = average(gpu, "enc")
+        decoder, _ = average(gpu, "dec")
+        if encoder is not None and decoder is not None:
+            line += f", encoder {encoder:.0f}%, decoder {decoder:.0f}%"
+        _, memory = average(gpu, "mem_used")
+        _, total = average(gpu, "mem_total")
+        if memory is not None and total:
+            line += f", VRAM peak {memory / 1024:.1f}/{total / 1024:.1f} GiB"
+        lines.append(line)
+
+    host = [s.get("host", {}) for s in samples]
+    cpu, _ = average(host, "cpu")
+    iowait, _ = average(host, "iowait")
+    if cpu is not None and iowait is not None:
+        lines.append(f"Host CPU averaged {cpu:.0f}%, IO wait {iowait:.0f}%")
+    return lines
+
+
+class TelemetrySampler:
+    """Samples GPU and host load into a ring buffer while jobs run.
+
+    GPU stats come from a single nvidia-smi process left running in loop
+    mode, so there's no process start per sample, and host CPU and IO wait
+    come from /proc/stat. A fixture file of recorded samples, one JSON
+    object per line, can be replayed instead.
+    """
+
+    def __init__(self, interval=TELEMETRY_INTERVAL, fixture=""):
+        self.interval = interval
+        self.fixture = fixture
+        self.samples = collections.deque(maxlen=TELEMETRY_BUFFER)
+        self.lock = threading.Lock()
+        self.gpus = {}
+        self.smi = None
+        self.stop_event = None
+
+    def start(self):
+        if self.stop_event is not None:
+            return
+        self.stop_event = threading.Event()
+        if self.fixture:
+            target = self._replay
+        else:
+            self._start_smi()
+            target = self._sample
+        threading.Thread(target=target, args=(self.stop_event,), daemon=True).start()
+
+    def stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+            self.stop_event = None
+        if self.smi:
+            self.smi.terminate()
+            self.smi = None
+
+    def _start_smi(self):
+        smi = shutil.which("nvidia-smi")
+        if not smi:
+            return
+        try:
+            self.smi = subprocess.Popen(
+                [
+                    smi,
+                    f"--query-gpu={','.join(NVIDIA_SMI_FIELDS)}",
+                    "--format=csv,noheader,nounits",
+                    "-lms",
+                    str(int(self.interval * 1000)),
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+        except OSError as e:
+            print(f"Could not start nvidia-smi: {e}")
+            return
+        threading.Thread(target=self._read_smi, args=(self.smi,), daemon=True).start()
+
+    def _read_smi(self, smi):
+        pending = {}
+        for line in smi.stdout:
+            parsed = parse_nvidia_smi_line(line)
+            if parsed is None:
+                continue
+            count, index, stats = parsed
+            pending[index] = stats
+            if len(pending) >= count:
+                with self.lock:
+                    self.gpus = pending
+                pending = {}
+
+    def _sample(self, stop_event):
+        previous = read_cpu_times()
+        while not stop_event.wait(self.interval):
+            current = read_cpu_times()
+            host = {}
+            if previous and current and current[0] > previous[0]:
+                total, idle, iowait = (c - p for c, p in zip(current, previous))
+                host = {
+                    "cpu": 100.0 * (total - idle - iowait) / total,
+                    "iowait": 100.0 * iowait / total,
+                }
+            previous = current
+            with self.lock:
+                self.samples.append(
+                    {"time": time.time(), "host": host, "devices": dict(self.gpus)}
+                )
+
+    def _replay(self, stop_event):
+        try:
+            with open(self.fixture) as f:
+                recorded = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            print(f"Could not read telemetry fixture: {e}")
+            return
+
+        for sample in itertools.cycle(recorded):
+            if stop_event.wait(self.interval):
+                return
+            with self.lock:
+                self.samples.append(dict(sample, time=time.time()))
+
+    def samples_between(self, start, end):
+        with self.lock:
+            return [s for s in self.samples if start <= s["time"] <= end]
+
+
+STALL_STARTUP_GRACE = 180
+STALL_MIN_SECONDS = 60
+STALL_MAX_SECONDS = 1800
+STALL_FACTOR = 50
+STALL_KILL_GRACE = 10
+
+
+class StallWatchdog:
+    """Tracks progress of the running stage and decides when it has hung.
+
+    The allowed gap between progress advances is STALL_FACTOR times the
+    expected time per frame, taken from the slower of this stage's own rate
+    and the rate seen on earlier jobs, so slow heavy jobs get more slack.
+    """
+
+    def __init__(self):
+        self.history = collections.deque(maxlen=20)
+        self.total_frames = 0
+        self.reset()
+
+    def reset(self):
+        now = time.monotonic()
+        self.stage_started = now
+        self.last_advance = now
+        self.first_frames_at = None
+        self.first_frames = 0
+        self.frames = 0
+
+    def start_job(self, total_frames):
+        self.total_frames = total_frames
+        self.reset()
+
+    def advance(self, frames=None, percent=None):
+        if frames is None and percent is not None:
+            frames = percent * (self.total_frames or 100) / 100.0
+        if frames is None or frames <= self.frames:
+            return
+
+        now = time.monotonic()
+        if self.first_frames_at is None:
+            self.first_frames_at = now
+            self.first_frames = frames
+        self.frames = frames
+        self.last_advance = now
+
+    def stage_rate(self):
+        if self.first_frames_at is None:
+            return 0.0
+        elapsed = self.last_advance - self.first_frames_at
+        if elapsed <= 0:
+            return 0.0
+        return (self.frames - self.first_frames) / elapsed
+
+    def finish_job(self):
+        rate = self.stage_rate()
+        if rate > 0:
+            self.history.append(rate)
+
+    def threshold(self):
+        if self.first_frames_at is None:
+            return STALL_STARTUP_GRACE
+        rates = [r for r in (self.stage_rate(), min(self.history, default=0)) if r]
+        if not rates:
+            return STALL_MIN_SECONDS
+        seconds = STALL_FACTOR / min(rates)
+        return max(STALL_MIN_SECONDS, min(STALL_MAX_SECONDS, seconds))
+
+    def stalled_for(self):
+        """Returns how long the stage has been stuck, or 0 if it isn't."""
+        idle = time.monotonic() - self.last_advance
+        return idle if idle > self.threshold() else 0
+
+
+class JobRunner(QObject):
+    """Runs the stages of one job one after another.
+
+    A stage is a (label, program, args) tuple. External programs run in a
+    QProcess; a callable runs on a worker thread and is passed the runner,
+    and may return more stages to run next. A callable that logs progress
+    the stall watchdog can follow sets reports_progress = True.
+    """
+
+    output_ready = Signal(str)
+    stage_started = Signal(str)
+    job_finished = Signal(bool)
+    stage_done = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.process = QProcess(self)
+        if hasattr(self.process, "setUnixProcessParameters"):
+            # Own session, so the whole process tree can be signalled at once.
+            self.process.setUnixProcessParameters(
+                QProcess.UnixProcessFlag.CreateNewSession
+            )
+        self.process.readyReadStandardOutput.connect(self.on_stdout_read)
+        self.process.readyReadStandardError.connect(self.on_stderr_read)
+        self.process.finished.connect(self.on_process_finished)
+        self.process.errorOccurred.connect(self.on_process_error)
+        self.stage_done.connect(self.on_stage_done)
+
+        self.stages = []
+        self.scratch_dirs = []
+        self.children = []
+        self.env_map = {}
+        self.cancelled = False
+        self.running = False
+        self.paused = False
+        self.deferred = False
+        self.silent_stage = False
+        self.exit_code = None
+        self.crashed = False
+        self.error = None
+        self.stall_reason = ""
+        self.tail = collections.deque(maxlen=200)
+        self.log_writer = None
+        self.log_path = ""
+
+    def log(self, text, backend=False):
+        """Shows and saves text. Only backend output, from the stage programs,
+        goes into the tail that failures are classified from."""
+        if backend:
+            self.tail.append(text)
+        if self.log_writer and self.log_path:
+            self.log_writer.write(self.log_path, text)
+        self.output_ready.emit(text)
+
+    def output_tail(self):
+        return "".join(self.tail)
+
+    def start(self, stages, env_map, scratch_dirs=(), log_path=""):
+        self.stages = list(stages)
+        self.log_path = log_path
+        self.scratch_dirs = list(scratch_dirs)
+        self.env_map = env_map
+        self.cancelled = False
+        self.running = True
+        self.paused = False
+        self.deferred = False
+        self.silent_stage = False
+        self.exit_code = None
+        self.crashed = False
+        self.error = None
+        self.stall_reason = ""
+        self.tail.clear()
+
+        process_env = QProcessEnvironment()
+        for key, value in env_map.items():
+            process_env.insert(key, value)
+        self.process.setProcessEnvironment(process_env)
+
+        self.run_next_stage()
+
+    def cancel(self):
+        self.cancelled = True
+        self.signal_processes(signal.SIGTERM)
+        if self.paused:
+            self.resume()
+        for child in self.children:
+            try:
+                child.kill()
+            except OSError:
+                pass
+
+    def process_ids(self):
+        pids = [child.pid for child in self.children if child.poll() is None]
+        if self.process.state() != QProcess.ProcessState.NotRunning:
+            pids.append(self.process.processId())
+        return [pid for pid in pids if pid]
+
+    def signal_processes(self, sig):
+        """Sends a signal to the process group of every running stage process."""
+        for pid in self.process_ids():
+            try:
+                os.killpg(pid, sig)
+            except ProcessLookupError:
+                # Not a group leader (older Qt), signal the process itself.
+                try:
+                    os.kill(pid, sig)
+                except OSError:
+                    pass
+            except OSError:
+                pass
+
+    def pause(self):
+        """Freezes the running stage's process group where it is."""
+        if self.running and not self.paused:
+            self.signal_processes(signal.SIGSTOP)
+            self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.signal_processes(signal.SIGCONT)
+            self.paused = False
+        if self.deferred:
+            self.deferred = False
+            self.run_next_stage()
+
+    def stall(self, reason):
+        """Stops a hung job: SIGTERM first, SIGKILL if it's still there later."""
+        self.stall_reason = reason
+        self.log(f"\n--- Stalled: {reason}, stopping ---\n")
+        self.signal_processes(signal.SIGTERM)
+        QTimer.singleShot(STALL_KILL_GRACE * 1000, self.kill_stalled)
+
+    def kill_stalled(self):
+        if self.running and self.stall_reason:
+            self.signal_processes(signal.SIGKILL)
+            self.signal_processes(signal.SIGCONT)
+
+    def run_next_stage(self):
+        if self.cancelled:
+            self.finish(False)
+            return
+        if not self.stages:
+            self.finish(True)
+            return
+        if self.paused:
+            # Started by resume() instead.
+            self.deferred = True
+            return
+
+        label, program, args = self.stages.pop(0)
+        self.silent_stage = callable(program) and not getattr(
+            program, "reports_progress", False
+        )
+        self.stage_started.emit(label)
+        if callable(program):
+            self.log(f"Stage: {label}\n")
+            threading.Thread(
+                target=self._run_callable, args=(program,), daemon=True
+            ).start()
+            return
+
+        self.log(f"Command: {program} {' '.join(args)}\n")
+        try:
+            self.process.start(program, args)
+        except Exception as e:
+            self.log(f"Failed to start process: {e}\n")
+            self.finish(False)
+
+    def run(self, command, timeout=None):
+        """Runs a helper program for a callable stage, like subprocess.run
+        with the output captured as text.
+
+        The program is kept in children while it runs, so it's paused, stopped
+        and killed with the job. Time spent paused doesn't count towards the
+        timeout.
+        """
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            env=self.env_map or None,
+            start_new_session=True,
+        )
+        self.children.append(process)
+        waited = 0
+        try:
+            while True:
+                try:
+                    stdout, _ = process.communicate(timeout=1)
+                    return subprocess.CompletedProcess(
+                        command, process.returncode, stdout, ""
+                    )
+                except subprocess.TimeoutExpired:
+                    if not self.paused:
+                        waited += 1
+                    if timeout is not None and waited >= timeout:
+                        process.kill()
+                        process.communicate()
+                        raise
+        finally:
+            self.children.remove(process)
+
+    def _run_callable(self, func):
+        try:
+            stages = func(self)
+        except Exception as e:
+            self.stage_done.emit(e)
+            return
+        self.stage_done.emit(stages)
+
+    def on_stage_done(self, result):
+        self.silent_stage = False
+        if isinstance(result, Exception):
+            self.error = result
+            self.log(f"Error: {result}\n")
+            self.finish(False)
+            return
+        if result:
+            self.stages[:0] = result
+        self.run_next_stage()
+
+    def on_process_finished(self, exit_code, exit_status):
+        self.exit_code = exit_code
+        self.crashed = exit_status != QProcess.ExitStatus.NormalExit
+        if self.crashed:
+            self.log("Process crashed or was killed\n")
+            self.finish(False)
+            return
+        if exit_code != 0:
+            self.log(f"Process exited with code {exit_code}\n")
+            self.finish(False)
+            return
+        self.run_next_stage()
+
+    def on_process_error(self, error):
+        if error == QProcess.ProcessError.FailedToStart:
+            self.log(f"Failed to start process: {self.process.errorString()}\n")
+            self.finish(False)
+
+    def finish(self, ok):
+        self.stages = []
+        for scratch_dir in self.scratch_dirs:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        self.scratch_dirs = []
+        self.running = False
+        self.deferred = False
+        self.silent_stage = False
+        self.job_finished.emit(ok)
+
+    def on_stdout_read(self):
+        data = self.process.readAllStandardOutput()
+        try:
+            text = bytes(data).decode("utf-8", errors="ignore")
+            self.log(text, backend=True)
+        except Exception as e:
+            print(f"STDOUT read error: {e}")
+
+    def on_stderr_read(self):
+        data = self.process.readAllStandardError()
+        try:
+            text = bytes(data).decode("utf-8", errors="ignore")
+            self.log(text, backend=True)
+        except Exception as e:
+            print(f"STDERR read error: {e}")
+
+
 class SettingsDialog(QDialog):
     """The modal settings dialog."""
 
@@ -338,14 +2264,29 @@ class SettingsDialog(QDialog):
         self.row_v2x_path.setText(self.settings.value("v2x-path", ""))
         self.row_ffmpeg_path.setText(self.settings.value("ffmpeg-path", ""))
         self.row_output_folder.setText(self.settings.value("output-folder", ""))
+        self.row_log_folder.setText(self.settings.value("log-folder", ""))
         self.row_auto_path.setChecked(
             self.settings.value("auto-output-path", False, type=bool)
         )
+        self.row_verify_outputs.setChecked(
+            self.settings.value("verify-outputs", True, type=bool)
+        )
+        self.row_gpu_devices.setText(self.settings.value("gpu-devices", "0"))
+        self.row_scratch_folder.setText(self.settings.value("scratch-folder", ""))
+        self.row_scratch_prefetch.setValue(
+            self.settings.value("scratch-prefetch", 2, type=int)
+        )
+        self.row_scratch_cap.setValue(
+            self.settings.value("scratch-cap-gb", 50, type=int)
+        )
 
         self.row_encoder.setText(self.settings.value("ffmpeg-encoder", "h264_nvenc"))
         self.row_encoder_opts.setText(
             self.settings.value("ffmpeg-opts", "preset=llhq,rc-lookahead=0")
         )
+        self.row_passthrough.setChecked(
+            self.settings.value("stream-passthrough", False, type=bool)
+        )
 
         self.row_realcugan_model.setText(
             self.settings.value("realcugan-model", "models-se")
@@ -356,10 +2297,17 @@ class SettingsDialog(QDialog):
         self.settings.setValue("v2x-path", self.row_v2x_path.text())
         self.settings.setValue("ffmpeg-path", self.row_ffmpeg_path.text())
         self.settings.setValue("output-folder", self.row_output_folder.text())
+        self.settings.setValue("log-folder", self.row_log_folder.text())
         self.settings.setValue("auto-output-path", self.row_auto_path.isChecked())
+        self.settings.setValue("verify-outputs", self.row_verify_outputs.isChecked())
+        self.settings.setValue("gpu-devices", self.row_gpu_devices.text())
+        self.settings.setValue("scratch-folder", self.row_scratch_folder.text())
+        self.settings.setValue("scratch-prefetch", self.row_scratch_prefetch.value())
+        self.settings.setValue("scratch-cap-gb", self.row_scratch_cap.value())
 
         self.settings.setValue("ffmpeg-encoder", self.row_encoder.text())
         self.settings.setValue("ffmpeg-opts", self.row_encoder_opts.text())
+        self.settings.setValue("stream-passthrough", self.row_passthrough.isChecked())
 
         self.settings.setValue("realcugan-model", self.row_realcugan_model.text())
         self.settings.setValue("rife-model-name", self.row_rife_model.text())
@@ -408,6 +2356,59 @@ class SettingsDialog(QDialog):
         self.row_auto_path = QCheckBox("Save output in default folder")
         self.row_auto_path.setToolTip("If off, output is saved next to the input file")
         layout_output.addRow(self.row_auto_path)
+
+        self.row_verify_outputs = QCheckBox("Verify outputs after each job")
+        self.row_verify_outputs.setToolTip(
+            "Check resolution, frame count, duration and audio streams against "
+            "the input, and retry jobs whose output doesn't match"
+        )
+        layout_output.addRow(self.row_verify_outputs)
+
+        self.row_log_folder = QLineEdit()
+        self.row_log_folder.setPlaceholderText("Application data folder")
+        self.add_browse_button(
+            layout_output,
+            "Job Log Folder",
+            self.row_log_folder,
+            "Select Log Folder",
+            is_folder=True,
+        )
+
+        group_scratch = QGroupBox("Scratch Storage")
+        layout_scratch = QFormLayout(group_scratch)
+        layout.addWidget(group_scratch)
+
+        self.row_scratch_folder = QLineEdit()
+        self.row_scratch_folder.setPlaceholderText("Off")
+        self.row_scratch_folder.setToolTip(
+            "Fast local folder (NVMe or tmpfs) for staged inputs and outputs"
+        )
+        self.add_browse_button(
+            layout_scratch,
+            "Scratch Folder",
+            self.row_scratch_folder,
+            "Select Scratch Folder",
+            is_folder=True,
+        )
+
+        self.row_scratch_prefetch = QSpinBox()
+        self.row_scratch_prefetch.setRange(0, 32)
+        layout_scratch.addRow("Prefetch Inputs:", self.row_scratch_prefetch)
+
+        self.row_scratch_cap = QSpinBox()
+        self.row_scratch_cap.setRange(1, 100000)
+        self.row_scratch_cap.setSuffix(" GB")
+        layout_scratch.addRow("Scratch Space Limit:", self.row_scratch_cap)
+
+        group_devices = QGroupBox("Devices")
+        layout_devices = QFormLayout(group_devices)
+        layout.addWidget(group_devices)
+
+        self.row_gpu_devices = QLineEdit()
+        self.row_gpu_devices.setToolTip(
+            "Comma separated GPU indices; jobs that run out of memory move to the next"
+        )
+        layout_devices.addRow("GPU Devices:", self.row_gpu_devices)
         layout.addStretch()
 
     def create_ffmpeg_page(self):
@@ -424,6 +2425,19 @@ class SettingsDialog(QDialog):
 
         self.row_encoder_opts = QLineEdit()
         layout_group.addRow("Encoder Options:", self.row_encoder_opts)
+
+        group_streams = QGroupBox("Streams")
+        layout_streams = QFormLayout(group_streams)
+        layout.addWidget(group_streams)
+
+        self.row_passthrough = QCheckBox(
+            "Copy audio, subtitles and chapters from the source"
+        )
+        self.row_passthrough.setToolTip(
+            "Only the video goes through Video2X; the other streams are "
+            "stream copied from the input file"
+        )
+        layout_streams.addRow(self.row_passthrough)
         layout.addStretch()
 
     def create_models_page(self):
@@ -473,6 +2487,37 @@ class SettingsDialog(QDialog):
             line_edit.setText(path)
 
 
+class JobHistoryDialog(QDialog):
+    """Lists the jobs of this session and shows the details of one."""
+
+    def __init__(self, jobs, parent=None):
+        super().__init__(parent)
+        self.jobs = jobs
+        self.setWindowTitle("Job History")
+        self.setMinimumSize(700, 450)
+
+        layout = QHBoxLayout(self)
+        self.job_list = QListWidget()
+        self.job_list.setMinimumWidth(250)
+        layout.addWidget(self.job_list)
+
+        self.details_view = QTextEdit()
+        self.details_view.setObjectName("log_view")
+        self.details_view.setReadOnly(True)
+        layout.addWidget(self.details_view, 1)
+
+        for job in jobs:
+            name = pathlib.Path(job.input_file).name
+            self.job_list.addItem(f"{name} \u2014 {job.status}")
+        self.job_list.currentRowChanged.connect(self.on_job_selected)
+        if jobs:
+            self.job_list.setCurrentRow(len(jobs) - 1)
+
+    def on_job_selected(self, row):
+        if 0 <= row < len(self.jobs):
+            self.details_view.setPlainText(self.jobs[row].details())
+
+
 class MainWindow(QMainWindow):
     """The main application window."""
 
@@ -482,10 +2527,46 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Video Enhancer")
         self.settings = settings
 
-        self.process = QProcess(self)
+        self.log_writer = LogWriter(self.log_folder())
+        QCoreApplication.instance().aboutToQuit.connect(self.log_writer.stop)
+        self.runner = self.create_runner()
+        self.preempted = []
+        self.urgent_queue = []
+        self.encoder_selector = EncoderSelector(settings)
         self.file_queue = []
         self.current_file = None
+        self.current_job = None
+        self.job_history = []
+        self.pending_retries = 0
+        self.pending_moves = 0
+        self.pending_verifications = 0
+        self.batch_id = 0
+        self.staging = None
+        self.manifest_entries = None
+        self.manifest_timer = QTimer(self)
+        self.manifest_timer.timeout.connect(self.load_manifest_chunk)
+        cache_dir = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.CacheLocation
+        )
+        self.telemetry = TelemetrySampler(
+            fixture=os.environ.get("C2X_TELEMETRY_FIXTURE", "")
+        )
+        QCoreApplication.instance().aboutToQuit.connect(self.telemetry.stop)
+        self.verifier = OutputVerifier(self)
+        self.verifier.verified.connect(self.on_output_verified)
+        self.thumbnails = ThumbnailCache(pathlib.Path(cache_dir) / "thumbnails", self)
+        self.thumbnails.ready.connect(self.on_thumbnail_ready)
+        self.previews = collections.OrderedDict()
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(100)
+        self.preview_timer.timeout.connect(self.update_previews)
         self.progress_regex = re.compile(r"\((\d+\.?\d*)\s*%\)")
+        self.frame_regex = re.compile(r"frame=\s*(\d+)")
+        self.watchdog = StallWatchdog()
+        self.watchdog_timer = QTimer(self)
+        self.watchdog_timer.setInterval(5000)
+        self.watchdog_timer.timeout.connect(self.check_stall)
 
         self.setAcceptDrops(True)
 
@@ -508,6 +2589,30 @@ class MainWindow(QMainWindow):
         self.settings_action.triggered.connect(self.on_settings_clicked)
         toolbar.addAction(self.settings_action)
 
+        self.history_action = QAction(
+            self.style().standardIcon(QStyle.StandardPixmap.SP_FileDialogInfoView),
+            "Job History",
+            self,
+        )
+        self.history_action.triggered.connect(self.on_history_clicked)
+        toolbar.addAction(self.history_action)
+
+        self.load_manifest_action = QAction(
+            self.style().standardIcon(QStyle.StandardPixmap.SP_DialogOpenButton),
+            "Run Manifest",
+            self,
+        )
+        self.load_manifest_action.triggered.connect(self.on_load_manifest_clicked)
+        toolbar.addAction(self.load_manifest_action)
+
+        self.save_manifest_action = QAction(
+            self.style().standardIcon(QStyle.StandardPixmap.SP_DialogSaveButton),
+            "Save Manifest",
+            self,
+        )
+        self.save_manifest_action.triggered.connect(self.on_save_manifest_clicked)
+        toolbar.addAction(self.save_manifest_action)
+
         banner_widget = QWidget()
         banner_widget.setObjectName("banner")
         banner_widget.setMinimumHeight(180)
@@ -539,9 +2644,12 @@ class MainWindow(QMainWindow):
 
         self.upscale_page = self.create_upscale_page()
         self.stabilize_page = self.create_stabilize_page()
+        self.chain_page = self.create_chain_page()
 
         self.view_stack.addTab(self.upscale_page, "Upscale")
         self.view_stack.addTab(self.stabilize_page, "Stabilize")
+        self.view_stack.addTab(self.chain_page, "Upscale + Stabilize")
+        self.view_stack.currentChanged.connect(lambda *_: self.preview_timer.start())
 
         self.progress_bar = QProgressBar()
         self.progress_bar.setTextVisible(True)
@@ -565,6 +2673,19 @@ class MainWindow(QMainWindow):
         self.cancel_button.clicked.connect(self.on_cancel_clicked)
         controls_layout.addWidget(self.cancel_button)
 
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setEnabled(False)
+        self.pause_button.setToolTip("Freeze the running job without losing work")
+        self.pause_button.clicked.connect(self.on_pause_clicked)
+        controls_layout.addWidget(self.pause_button)
+
+        self.urgent_button = QPushButton("Run Urgent...")
+        self.urgent_button.setToolTip(
+            "Pause the running job, process the chosen files first, then resume"
+        )
+        self.urgent_button.clicked.connect(self.on_urgent_clicked)
+        controls_layout.addWidget(self.urgent_button)
+
         self.terminal_toggle = QCheckBox("Show Log")
         self.terminal_toggle.toggled.connect(self.on_toggle_terminal)
         controls_layout.addSpacing(20)
@@ -577,13 +2698,28 @@ class MainWindow(QMainWindow):
         self.textview_output.setMinimumHeight(200)
         container_layout.addWidget(self.textview_output)
 
-        self.process.readyReadStandardOutput.connect(self.on_stdout_read)
-        self.process.readyReadStandardError.connect(self.on_stderr_read)
-        self.process.finished.connect(self.process_finished)
-
     def set_default_size(self, width, height):
         self.resize(width, height)
 
+    def log_folder(self):
+        folder = self.settings.value("log-folder", "")
+        if folder:
+            return folder
+        data_dir = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.AppLocalDataLocation
+        )
+        return str(pathlib.Path(data_dir) / "logs")
+
+    def create_runner(self):
+        runner = JobRunner(self)
+        runner.log_writer = self.log_writer
+        runner.output_ready.connect(self.add_output_text)
+        runner.stage_started.connect(self.on_stage_started)
+        runner.job_finished.connect(
+            lambda ok, runner=runner: self.on_runner_finished(runner, ok)
+        )
+        return runner
+
     def create_batch_list_box(self, add_callback, clear_callback):
         box = QWidget()
         layout = QVBoxLayout(box)
@@ -609,6 +2745,11 @@ class MainWindow(QMainWindow):
         list_box.setDragDropMode(QListWidget.DragDropMode.InternalMove)
         list_box.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
         btn_clear.clicked.connect(list_box.clear)
+        list_box.setIconSize(QSize(96, 54))
+        list_box.verticalScrollBar().valueChanged.connect(
+            lambda *_: self.preview_timer.start()
+        )
+        list_box.model().rowsInserted.connect(lambda *_: self.preview_timer.start())
         layout.addWidget(list_box)
 
         return box, list_box
@@ -639,10 +2780,41 @@ class MainWindow(QMainWindow):
         self.upscale_scale_spin.setDecimals(0)
         layout_group.addRow("Upscale Ratio:", self.upscale_scale_spin)
 
+        self.upscale_target_check = QCheckBox("Upscale to target resolution")
+        self.upscale_target_check.setToolTip(
+            "Pick the smallest ratio that reaches the target size for each file"
+        )
+        layout_group.addRow(self.upscale_target_check)
+
+        target_box = QWidget()
+        target_layout = QHBoxLayout(target_box)
+        target_layout.setContentsMargins(0, 0, 0, 0)
+        self.upscale_target_width_spin = QSpinBox()
+        self.upscale_target_width_spin.setRange(16, 16384)
+        self.upscale_target_width_spin.setValue(3840)
+        self.upscale_target_height_spin = QSpinBox()
+        self.upscale_target_height_spin.setRange(16, 16384)
+        self.upscale_target_height_spin.setValue(2160)
+        target_layout.addWidget(self.upscale_target_width_spin)
+        target_layout.addWidget(QLabel("x"))
+        target_layout.addWidget(self.upscale_target_height_spin)
+        target_box.setEnabled(False)
+        self.upscale_target_check.toggled.connect(target_box.setEnabled)
+        self.upscale_target_check.toggled.connect(
+            lambda checked: self.upscale_scale_spin.setEnabled(not checked)
+        )
+        layout_group.addRow("Target Resolution:", target_box)
+
         self.upscale_backend_combo = QComboBox()
         self.upscale_backend_combo.addItems(["gpu"])
         layout_group.addRow("AI Backend:", self.upscale_backend_combo)
 
+        self.upscale_dedup_check = QCheckBox("Skip duplicate frames")
+        self.upscale_dedup_check.setToolTip(
+            "Only upscale unique frames and restore the original timing afterwards"
+        )
+        layout_group.addRow(self.upscale_dedup_check)
+
         layout.addStretch()
         return page_box
 
@@ -670,14 +2842,100 @@ class MainWindow(QMainWindow):
         layout.addStretch()
         return page_box
 
-    def add_file_to_list(self, path_str):
-        current_index = self.view_stack.currentIndex()
-        list_box = None
+    def create_chain_page(self):
+        page_box = QWidget()
+        layout = QVBoxLayout(page_box)
+        layout.setContentsMargins(0, 5, 0, 0)
+
+        list_area, self.chain_file_list = self.create_batch_list_box(
+            self.on_add_files, None
+        )
+        layout.addWidget(list_area)
+
+        group = QGroupBox("Upscale + Stabilize Options")
+        layout_group = QFormLayout(group)
+        layout_group.setRowWrapPolicy(QFormLayout.RowWrapPolicy.WrapAllRows)
+        layout.addWidget(group)
+
+        self.chain_scale_spin = QSpinBox()
+        self.chain_scale_spin.setRange(1, 4)
+        self.chain_scale_spin.setValue(2)
+        layout_group.addRow("Upscale Ratio:", self.chain_scale_spin)
+
+        self.chain_factor_spin = QSpinBox()
+        self.chain_factor_spin.setRange(2, 8)
+        self.chain_factor_spin.setValue(2)
+        layout_group.addRow("Interpolation Factor:", self.chain_factor_spin)
+
+        self.chain_order_label = QLabel()
+        layout_group.addRow("Stage Order:", self.chain_order_label)
+        self.chain_scale_spin.valueChanged.connect(self.update_chain_order_label)
+        self.chain_factor_spin.valueChanged.connect(self.update_chain_order_label)
+        self.update_chain_order_label()
+
+        layout.addStretch()
+        return page_box
 
+    def update_chain_order_label(self):
+        order = plan_chain_order(
+            self.chain_scale_spin.value(), self.chain_factor_spin.value()
+        )
+        self.chain_order_label.setText(" \u2192 ".join(s.capitalize() for s in order))
+
+    def active_file_list(self):
+        current_index = self.view_stack.currentIndex()
         if current_index == 0:
-            list_box = self.upscale_file_list
+            return self.upscale_file_list
         elif current_index == 1:
-            list_box = self.stabilize_file_list
+            return self.stabilize_file_list
+        elif current_index == 2:
+            return self.chain_file_list
+        return None
+
+    def update_previews(self):
+        """Shows or requests previews for the rows in view of the active list."""
+        list_box = self.active_file_list()
+        if not list_box or list_box.count() == 0:
+            return
+
+        viewport = list_box.viewport().rect()
+        first = list_box.indexAt(viewport.topLeft()).row()
+        last = list_box.indexAt(viewport.bottomLeft()).row()
+        if first < 0:
+            first = 0
+        if last < 0:
+            last = list_box.count() - 1
+
+        ffmpeg_dir = self.settings.value("ffmpeg-path", "")
+        ffmpeg = find_tool(ffmpeg_dir, "ffmpeg")
+        ffprobe = find_tool(ffmpeg_dir, "ffprobe")
+        visible = set()
+        for row in range(first, last + 1):
+            item = list_box.item(row)
+            path = item.data(Qt.ItemDataRole.UserRole)
+            visible.add(path)
+            if path not in self.previews:
+                self.thumbnails.request(path, ffmpeg, ffprobe)
+                continue
+
+            self.previews.move_to_end(path)
+            icon, facts = self.previews[path]
+            if facts and item.data(PREVIEW_ROLE) != facts:
+                item.setText(f"{pathlib.Path(path).name}\n{facts}")
+                item.setData(PREVIEW_ROLE, facts)
+            if icon is not None and item.icon().isNull():
+                item.setIcon(icon)
+        self.thumbnails.keep_only(visible)
+
+    def on_thumbnail_ready(self, path, image, info):
+        icon = QIcon(QPixmap(image)) if image else None
+        self.previews[path] = (icon, format_facts(info) if info else "")
+        while len(self.previews) > THUMBNAIL_MEMORY_ITEMS:
+            self.previews.popitem(last=False)
+        self.preview_timer.start()
+
+    def add_file_to_list(self, path_str):
+        list_box = self.active_file_list()
 
         if list_box:
             item = QListWidgetItem(pathlib.Path(path_str).name)
@@ -725,6 +2983,103 @@ class MainWindow(QMainWindow):
         dialog = SettingsDialog(self.settings, self)
         dialog.exec()
 
+    def on_history_clicked(self, button):
+        dialog = JobHistoryDialog(self.job_history, self)
+        dialog.exec()
+
+    def on_load_manifest_clicked(self, button):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Select Batch Manifest", "", MANIFEST_FILTER
+        )
+        if path:
+            self.run_manifest(path)
+
+    def on_save_manifest_clicked(self, button):
+        list_box = self.active_file_list()
+        if not list_box or list_box.count() == 0:
+            self.send_toast("No files in batch list to save.")
+            return
+        base = self.job_spec(self.view_stack.currentIndex())
+        if base is None:
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save Batch Manifest", "batch.json", MANIFEST_FILTER
+        )
+        if not path:
+            return
+        specs = (
+            dataclasses.replace(
+                base, input_file=list_box.item(i).data(Qt.ItemDataRole.UserRole)
+            )
+            for i in range(list_box.count())
+        )
+        try:
+            write_manifest(path, specs)
+        except (OSError, ValueError) as e:
+            self.send_toast(f"Error saving manifest: {e}")
+            return
+        self.send_toast(f"Saved {list_box.count()} job(s) to {path}")
+
+    def run_manifest(self, path):
+        """Queues the jobs of a manifest, starting before it's fully read.
+
+        Fields a manifest entry leaves out are taken from the current
+        settings of the active tab.
+        """
+        if self.manifest_entries is not None:
+            self.send_toast("A manifest is already loading.")
+            return
+        base = self.job_spec(self.view_stack.currentIndex())
+        if base is None:
+            return
+
+        self.manifest_entries = self.manifest_specs(path, base)
+        if self.run_button.isEnabled():
+            self.textview_output.clear()
+            self.file_queue.clear()
+            self.update_staging()
+            self.set_processing_state(True)
+        self.add_output_text(f"--- Reading manifest: {path} ---\n")
+        self.manifest_timer.start(0)
+
+    def manifest_specs(self, path, base):
+        entries = read_manifest(path)
+        number = 0
+        while True:
+            number += 1
+            try:
+                entry = next(entries)
+            except StopIteration:
+                return
+            except (OSError, ValueError, csv.Error) as e:
+                self.add_output_text(f"Error reading manifest: {e}\n")
+                return
+            try:
+                if not isinstance(entry, dict):
+                    raise ValueError("not a table of fields")
+                yield spec_from_entry(base, entry)
+            except (ValueError, TypeError) as e:
+                self.add_output_text(f"Skipping manifest entry {number}: {e}\n")
+
+    def load_manifest_chunk(self):
+        count = 0
+        for spec in self.manifest_entries:
+            job = JobRecord(spec)
+            job.batch_id = self.batch_id
+            self.file_queue.append(job)
+            self.job_history.append(job)
+            count += 1
+            if count == MANIFEST_CHUNK:
+                break
+        else:
+            self.manifest_timer.stop()
+            self.manifest_entries = None
+            self.add_output_text("--- Manifest read ---\n")
+
+        if not self.runner.running and self.current_job is None:
+            self.run_next_file()
+
     def on_toggle_terminal(self, checked):
         self.textview_output.setVisible(checked)
 
@@ -747,49 +3102,298 @@ class MainWindow(QMainWindow):
                     self.progress_bar.setValue(int(percent_float))
                     file_name = pathlib.Path(self.current_file).name
                     self.progress_bar.setFormat(f"{file_name} [{percent_str}%]")
+                    self.watchdog.advance(percent=percent_float)
                 except Exception as e:
                     print(f"Progress parse error: {e}")
 
+            frames = self.frame_regex.findall(text)
+            if frames:
+                self.watchdog.advance(frames=int(frames[-1]))
+
+    def on_stage_started(self, label):
+        # The total is only known once the job's first stage has probed it.
+        if self.current_job:
+            self.watchdog.start_job(self.current_job.total_frames)
+
+    def check_stall(self):
+        # Callable stages without reports_progress have nothing to follow.
+        if (
+            not self.runner.running
+            or self.runner.paused
+            or self.runner.silent_stage
+            or self.runner.stall_reason
+        ):
+            return
+        idle = self.watchdog.stalled_for()
+        if idle:
+            reason = (
+                f"no progress for {idle:.0f}s "
+                f"(limit {self.watchdog.threshold():.0f}s)"
+            )
+            if self.current_job:
+                self.current_job.log(f"Stalled: {reason}")
+            self.runner.stall(reason)
+
     def send_toast(self, text):
         self.statusBar.showMessage(text, 5000)
 
     def set_processing_state(self, is_processing):
         self.run_button.setEnabled(not is_processing)
         self.cancel_button.setEnabled(is_processing)
+        self.pause_button.setEnabled(is_processing)
         self.view_stack.setEnabled(not is_processing)
         self.settings_action.setEnabled(not is_processing)
+        self.save_manifest_action.setEnabled(not is_processing)
+        if is_processing:
+            self.telemetry.start()
+        else:
+            self.telemetry.stop()
+        if not is_processing:
+            self.pause_button.setText("Pause")
 
     def on_cancel_clicked(self, widget):
-        if self.process.state() == QProcess.ProcessState.Running:
+        for job in self.file_queue + self.urgent_queue:
+            job.status = "cancelled"
+        self.file_queue.clear()
+        self.urgent_queue.clear()
+        self.manifest_timer.stop()
+        self.manifest_entries = None
+        self.batch_id += 1
+        self.pending_retries = 0
+
+        # Their entries stay until job_finished, where complete_job runs.
+        for runner, _ in list(self.preempted):
+            runner.cancel()
+
+        if self.runner.running:
             self.add_output_text("\n--- Cancelling process ---\n")
-            self.process.terminate()
-            self.file_queue.clear()
-            self.current_file = None
+            self.runner.cancel()
+        else:
+            self.run_next_file()
 
-    def process_finished(self, exit_code, exit_status):
-        if self.current_file:
-            self.add_output_text(f"\n--- Finished: {self.current_file} ---\n")
-            self.current_file = None
+    def on_pause_clicked(self, widget):
+        job = self.current_job
+        if not job or not self.runner.running:
+            return
+
+        if self.runner.paused:
+            job.user_paused = False
+            self.resume_current()
         else:
+            job.user_paused = True
+            self.pause_current()
+
+    def pause_current(self):
+        self.runner.pause()
+        self.watchdog_timer.stop()
+        self.current_job.status = "paused"
+        self.current_job.log("Paused")
+        self.add_output_text(f"\n--- Paused: {self.current_job.input_file} ---\n")
+        self.progress_bar.setFormat(
+            f"{pathlib.Path(self.current_job.input_file).name} [Paused]"
+        )
+        self.pause_button.setText("Resume")
+
+    def resume_current(self):
+        self.watchdog.start_job(self.current_job.total_frames)
+        self.watchdog_timer.start()
+        self.current_job.status = "running"
+        self.current_job.log("Resumed")
+        self.add_output_text(f"\n--- Resumed: {self.current_job.input_file} ---\n")
+        self.pause_button.setText("Pause")
+        # Last, as it may start the next stage.
+        self.runner.resume()
+
+    def on_urgent_clicked(self, widget):
+        files, _ = QFileDialog.getOpenFileNames(
+            self,
+            "Select Urgent Video Files",
+            "",
+            "Video Files (*.mp4 *.mkv *.mov *.avi *.webm)",
+        )
+        if files:
+            self.run_urgent(files)
+
+    def run_urgent(self, files):
+        base = self.job_spec(self.view_stack.currentIndex())
+        if base is None:
+            return
+        for file_path in files:
+            job = JobRecord(dataclasses.replace(base, input_file=file_path))
+            job.urgent = True
+            job.batch_id = self.batch_id
+            self.urgent_queue.append(job)
+            self.job_history.append(job)
+
+        if self.runner.running:
+            if not self.current_job.urgent:
+                self.preempt_current()
+        elif not self.run_button.isEnabled():
+            self.run_next_file()
+        else:
+            self.textview_output.clear()
+            self.set_processing_state(True)
+            self.run_next_file()
+
+    def preempt_current(self):
+        """Freezes the running job and frees its device for urgent work."""
+        if not self.runner.paused:
+            self.pause_current()
+        self.current_job.log("Preempted by urgent work")
+        self.watchdog.finish_job()
+        self.preempted.append((self.runner, self.current_job))
+        self.runner = self.create_runner()
+        self.current_job = None
+        self.current_file = None
+        self.run_next_file()
+
+    def can_resume_preempted(self):
+        return any(not runner.cancelled for runner, _ in self.preempted)
+
+    def resume_preempted(self):
+        entry = [e for e in self.preempted if not e[0].cancelled][-1]
+        self.preempted.remove(entry)
+        self.runner.deleteLater()
+        self.runner, job = entry
+        self.current_job = job
+        self.current_file = job.input_file
+        self.add_output_text(f"\n--- Back to: {job.input_file} ---\n")
+        if job.user_paused:
+            self.pause_button.setText("Resume")
+        else:
+            self.resume_current()
+
+    def on_runner_finished(self, runner, ok):
+        if runner is self.runner:
+            self.process_finished(ok)
+            return
+
+        for entry in self.preempted:
+            if entry[0] is runner:
+                self.preempted.remove(entry)
+                self.complete_job(entry[1], runner, ok)
+                break
+        runner.deleteLater()
+        if not self.runner.running and not self.run_button.isEnabled():
+            self.run_next_file()
+
+    def process_finished(self, ok):
+        job = self.current_job
+        self.current_job = None
+        self.current_file = None
+        if job is None:
             self.add_output_text("\n--- Process Finished ---\n")
+            self.run_next_file()
+            return
 
+        self.watchdog_timer.stop()
+        self.watchdog.finish_job()
+        self.complete_job(job, self.runner, ok)
         self.run_next_file()
 
-    def on_stdout_read(self):
-        data = self.process.readAllStandardOutput()
-        try:
-            text = bytes(data).decode("utf-8", errors="ignore")
-            self.add_output_text(text)
-        except Exception as e:
-            print(f"STDOUT read error: {e}")
+    def complete_job(self, job, runner, ok):
+        job.ended = time.time()
+        if job.started:
+            job.telemetry.extend(self.telemetry.samples_between(job.started, job.ended))
+        if self.staging:
+            self.staging.release(job.input_file)
+        if job.log_path:
+            self.log_writer.write(
+                job.log_path,
+                f"\n=== Attempt {job.attempts} ended: "
+                f"{'ok' if ok else 'failed'} ===\n",
+            )
+            self.log_writer.close(job.log_path)
+        if ok and job.staged_output:
+            job.status = "moving"
+            job.log("Finished, moving output back")
+            self.add_output_text(f"\n--- Finished: {job.input_file} ---\n")
+            self.pending_moves += 1
+            self.staging.move_back(job, job.staged_output, job.output_file)
+            return
+        if job.staged_output:
+            shutil.rmtree(pathlib.Path(job.staged_output).parent, ignore_errors=True)
+        if ok:
+            job.log("Finished")
+            self.add_output_text(f"\n--- Finished: {job.input_file} ---\n")
+            self.verify_job(job)
+        elif runner.cancelled:
+            job.status = "cancelled"
+            job.log("Cancelled")
+            self.add_output_text(f"\n--- Cancelled: {job.input_file} ---\n")
+        elif runner.stall_reason:
+            self.handle_failure(job, "stalled")
+        elif isinstance(runner.error, InputError):
+            self.handle_failure(job, "input")
+        else:
+            failure = classify_failure(
+                runner.exit_code, runner.crashed, runner.output_tail()
+            )
+            self.handle_failure(job, failure)
 
-    def on_stderr_read(self):
-        data = self.process.readAllStandardError()
-        try:
-            text = bytes(data).decode("utf-8", errors="ignore")
-            self.add_output_text(text)
-        except Exception as e:
-            print(f"STDERR read error: {e}")
+    def handle_failure(self, job, failure):
+        job.failure = failure
+        policy = FAILURE_POLICY.get(failure, "retry")
+
+        if policy == "quarantine" or job.attempts > MAX_RETRIES:
+            job.status = "quarantined"
+            job.log(f"Failed ({failure}), quarantined after {job.attempts} attempt(s)")
+            self.add_output_text(
+                f"\n--- Quarantined: {job.input_file} ({failure}) ---\n"
+            )
+            return
+        if job.batch_id != self.batch_id:
+            # A late result, such as a verification, from a cancelled batch.
+            job.status = "cancelled"
+            job.log(f"Failed ({failure}), not retried as the batch was cancelled")
+            return
+
+        delay = RETRY_BASE_DELAY * 2 ** (job.attempts - 1)
+        if failure == "oom":
+            job.tried_devices.append(job.device)
+            if self.next_device(job) not in job.tried_devices:
+                delay = 0
+        elif failure == "encoder" and job.encoder:
+            job.excluded_encoders.append(job.encoder)
+            delay = 0
+
+        job.status = "retrying"
+        job.log(f"Failed ({failure}), retrying in {delay}s")
+        self.add_output_text(
+            f"\n--- Failed: {job.input_file} ({failure}), retrying in {delay}s ---\n"
+        )
+        self.pending_retries += 1
+        QTimer.singleShot(delay * 1000, lambda: self.requeue_job(job))
+
+    def requeue_job(self, job):
+        if job.batch_id != self.batch_id:
+            return
+        self.pending_retries -= 1
+        job.status = "queued"
+        if job.urgent:
+            self.urgent_queue.append(job)
+            if self.runner.running and not self.current_job.urgent:
+                self.preempt_current()
+                return
+        else:
+            self.file_queue.append(job)
+        if not self.runner.running and not self.run_button.isEnabled():
+            self.run_next_file()
+
+    def next_device(self, job, busy=()):
+        """Picks a device job hasn't failed on, avoiding the busy ones if it can.
+
+        A preempted job is only frozen and keeps its VRAM, so urgent work
+        shares its device only when there's no other.
+        """
+        devices = [
+            d.strip()
+            for d in self.settings.value("gpu-devices", "0").split(",")
+            if d.strip()
+        ] or ["0"]
+        untried = [d for d in devices if d not in job.tried_devices] or devices
+        free = [d for d in untried if d not in busy]
+        return (free or untried)[0]
 
     def _find_ffmpeg_path(self):
         setting_path = self.settings.value("ffmpeg-path", "")
@@ -813,24 +3417,57 @@ class MainWindow(QMainWindow):
         )
         return ""
 
-    def generate_output_path(self, input_path_str):
-        p = pathlib.Path(input_path_str)
-
+    def job_spec(self, mode, input_file=""):
+        """Snapshots the current settings into a spec for new jobs."""
+        output_folder = ""
         if self.settings.value("auto-output-path", False, type=bool):
-            base_dir_str = self.settings.value("output-folder", "")
-            if not base_dir_str:
+            output_folder = self.settings.value("output-folder", "")
+            if not output_folder:
                 self.send_toast("Error: Default output folder not set in settings.")
                 return None
-            base_dir = pathlib.Path(base_dir_str)
+
+        if mode == 2:
+            scale = self.chain_scale_spin.value()
+            factor = self.chain_factor_spin.value()
         else:
-            base_dir = p.parent
+            scale = int(self.upscale_scale_spin.value())
+            factor = int(self.rife_factor_spin.value())
+
+        target = mode == 0 and self.upscale_target_check.isChecked()
+        return JobSpec(
+            input_file=input_file,
+            mode=mode,
+            output_folder=output_folder,
+            model=self.upscale_model_combo.currentText(),
+            realcugan_model=self.settings.value("realcugan-model", ""),
+            backend=self.upscale_backend_combo.currentText(),
+            scale=scale,
+            rife_model=self.settings.value("rife-model-name", "rife-v4.6"),
+            factor=factor,
+            target_width=self.upscale_target_width_spin.value() if target else 0,
+            target_height=self.upscale_target_height_spin.value() if target else 0,
+            dedup=mode == 0 and self.upscale_dedup_check.isChecked(),
+            encoder=self.settings.value("ffmpeg-encoder", ""),
+            encoder_opts=self.settings.value("ffmpeg-opts", ""),
+            stream_passthrough=self.settings.value(
+                "stream-passthrough", False, type=bool
+            ),
+        )
+
+    def generate_output_path(self, spec):
+        if spec.output_file:
+            pathlib.Path(spec.output_file).parent.mkdir(parents=True, exist_ok=True)
+            return spec.output_file
 
+        p = pathlib.Path(spec.input_file)
+        base_dir = pathlib.Path(spec.output_folder) if spec.output_folder else p.parent
         base_dir.mkdir(parents=True, exist_ok=True)
 
-        current_index = self.view_stack.currentIndex()
         suffix = "_upscaled"
-        if current_index == 1:
+        if spec.mode == 1:
             suffix = "_stabilized"
+        elif spec.mode == 2:
+            suffix = "_enhanced"
 
         return str(base_dir / f"{p.stem}{suffix}{p.suffix}")
 
@@ -838,12 +3475,7 @@ class MainWindow(QMainWindow):
         self.textview_output.clear()
         self.file_queue.clear()
 
-        current_index = self.view_stack.currentIndex()
-        list_box = None
-        if current_index == 0:
-            list_box = self.upscale_file_list
-        elif current_index == 1:
-            list_box = self.stabilize_file_list
+        list_box = self.active_file_list()
 
         if not list_box:
             self.send_toast("Error: Could not find active file list.")
@@ -853,37 +3485,142 @@ class MainWindow(QMainWindow):
             self.send_toast("No files in batch list to process.")
             return
 
+        base = self.job_spec(self.view_stack.currentIndex())
+        if base is None:
+            return
         for i in range(list_box.count()):
             item = list_box.item(i)
             file_path = item.data(Qt.ItemDataRole.UserRole)
-            self.file_queue.append(file_path)
+            job = JobRecord(dataclasses.replace(base, input_file=file_path))
+            job.batch_id = self.batch_id
+            self.file_queue.append(job)
+            self.job_history.append(job)
 
         if not self.file_queue:
             self.send_toast("No files in batch list to process.")
             return
 
+        self.update_staging()
         self.set_processing_state(True)
         self.run_next_file()
 
+    def update_staging(self):
+        folder = self.settings.value("scratch-folder", "")
+        if not folder:
+            self.staging = None
+            return
+
+        max_bytes = int(self.settings.value("scratch-cap-gb", 50, type=int) * 1024**3)
+        if self.staging is None or str(self.staging.folder) != folder:
+            self.staging = ScratchStaging(folder, max_bytes, self)
+            self.staging.output_moved.connect(self.on_output_moved)
+        self.staging.max_bytes = max_bytes
+
+    def on_output_moved(self, job, error):
+        self.pending_moves -= 1
+        if error:
+            job.status = "failed"
+            job.log(
+                f"Could not move output back: {error}; "
+                f"it is still at {job.staged_output}"
+            )
+            self.add_output_text(
+                f"\n--- Failed to move {job.staged_output} to "
+                f"{job.output_file}: {error} ---\n"
+            )
+        else:
+            job.log(f"Output moved to {job.output_file}")
+            self.verify_job(job)
+        if not self.runner.running and not self.run_button.isEnabled():
+            self.run_next_file()
+
+    def verify_job(self, job):
+        if not self.settings.value("verify-outputs", True, type=bool):
+            job.status = "finished"
+            return
+        job.status = "verifying"
+        self.pending_verifications += 1
+        ffprobe = find_tool(self.settings.value("ffmpeg-path", ""), "ffprobe")
+        # Queued behind the launch of the next job so it doesn't delay it.
+        QTimer.singleShot(0, lambda: self.verifier.verify(job, ffprobe))
+
+    def on_output_verified(self, job, problems):
+        self.pending_verifications -= 1
+        if problems:
+            summary = "; ".join(problems)
+            job.log(f"Output failed verification: {summary}")
+            self.add_output_text(
+                f"\n--- Output failed verification: {job.output_file}: {summary} ---\n"
+            )
+            self.handle_failure(job, "verify")
+        else:
+            job.status = "finished"
+            job.log("Output verified")
+        if not self.runner.running and not self.run_button.isEnabled():
+            self.run_next_file()
+
     def run_next_file(self):
-        if not self.file_queue:
+        if not self.urgent_queue and self.can_resume_preempted():
+            self.resume_preempted()
+            return
+
+        if not self.file_queue and not self.urgent_queue and self.preempted:
+            self.progress_bar.setFormat(f"Stopping {len(self.preempted)} job(s)...")
+            return
+
+        if not self.file_queue and not self.urgent_queue and self.pending_retries:
+            self.progress_bar.setFormat(
+                f"Waiting to retry {self.pending_retries} file(s)..."
+            )
+            return
+
+        if not self.file_queue and not self.urgent_queue and self.manifest_entries:
+            self.progress_bar.setFormat("Reading manifest...")
+            return
+
+        if not self.file_queue and not self.urgent_queue and self.pending_moves:
+            self.progress_bar.setFormat(
+                f"Moving {self.pending_moves} output(s) back..."
+            )
+            return
+
+        if not self.file_queue and not self.urgent_queue and self.pending_verifications:
+            self.progress_bar.setFormat(
+                f"Verifying {self.pending_verifications} output(s)..."
+            )
+            return
+
+        if not self.file_queue and not self.urgent_queue:
             self.add_output_text("\n--- All jobs finished ---\n")
+            quarantined = [j for j in self.job_history if j.status == "quarantined"]
+            if quarantined:
+                self.add_output_text(
+                    f"{len(quarantined)} file(s) quarantined, see Job History\n"
+                )
             self.set_processing_state(False)
             self.progress_bar.setFormat("Finished")
             self.progress_bar.setValue(100)
             self.current_file = None
             return
 
-        input_file = self.file_queue.pop(0)
+        if self.urgent_queue:
+            job = self.urgent_queue.pop(0)
+        else:
+            job = self.file_queue.pop(0)
+        input_file = job.input_file
         self.current_file = input_file
 
         self.add_output_text(f"\n--- Processing: {input_file} ---\n")
         self.progress_bar.setValue(0)
         self.progress_bar.setFormat(f"Starting {pathlib.Path(input_file).name}...")
 
-        output_file = self.generate_output_path(input_file)
-        if not output_file:
-            self.add_output_text("Error: Could not generate output path. Skipping.\n")
+        spec = job.spec
+        try:
+            output_file = self.generate_output_path(spec)
+        except OSError as e:
+            self.add_output_text(f"Error: Could not create output folder: {e}\n")
+            job.status = "failed"
+            job.log(f"Could not create output folder: {e}")
             self.run_next_file()
             return
 
@@ -892,60 +3629,340 @@ class MainWindow(QMainWindow):
             self.add_output_text(
                 f"Error: Video2X executable not found at '{v2x_path}'. Check Settings.\n"
             )
-            self.set_processing_state(False)
+            self.halt_batch(job)
             return
 
-        command_args = ["-i", input_file, "-o", output_file]
-        current_index = self.view_stack.currentIndex()
+        if job.mode in (1, 2) and not spec.rife_model:
+            self.add_output_text("Error: RIFE model name not set in settings.\n")
+            self.halt_batch(job)
+            return
 
-        try:
-            if current_index == 0:
-                model = self.upscale_model_combo.currentText()
-                realcugan_model = self.settings.value("realcugan-model", "")
-                scale = int(self.upscale_scale_spin.value())
-                backend = self.upscale_backend_combo.currentText()
-
-                command_args.extend(["-p", model])
-                if model == "realcugan":
-                    command_args.extend(["--realcugan-model", realcugan_model])
-                command_args.extend(["-s", str(scale)])
-                if backend == "gpu":
-                    command_args.extend(["-d", "0"])
-
-            elif current_index == 1:
-                rife_model_name = self.settings.value("rife-model-name", "rife-v4.6")
-                rife_factor = int(self.rife_factor_spin.value())
-
-                if not rife_model_name:
-                    raise ValueError("RIFE model name not set in settings.")
-
-                command_args.extend(
-                    [
-                        "-p",
-                        "rife",
-                        "--rife-model",
-                        rife_model_name,
-                        "-m",
-                        str(rife_factor),
-                        "-d",
-                        "0",
-                    ]
+        ffmpeg_path = self._find_ffmpeg_path()
+        ffmpeg = find_tool(ffmpeg_path, "ffmpeg")
+        ffprobe = find_tool(ffmpeg_path, "ffprobe")
+        env_map = self.build_environment(ffmpeg_path)
+
+        job.output_file = output_file
+        job.staged_output = ""
+        if self.staging:
+            input_file = self.staging.input_for(job.input_file)
+            if input_file != job.input_file:
+                job.log(f"Reading staged copy {input_file}")
+            try:
+                output_file = self.staging.output_path(job.output_file)
+                job.staged_output = output_file
+            except OSError as e:
+                job.log(f"Writing output directly, scratch unavailable: {e}")
+        job.device = self.next_device(job, [j.device for _, j in self.preempted])
+        self.current_job = job
+
+        job.status = "running"
+        job.attempts += 1
+        job.started = time.time()
+        job.total_frames = 0
+        job.log(f"Attempt {job.attempts} on device {job.device}")
+        if not job.log_path:
+            self.log_writer.folder = pathlib.Path(self.log_folder())
+            job.log_path = self.log_writer.new_log(job.input_file)
+        self.log_writer.write(
+            job.log_path,
+            f"=== Attempt {job.attempts}: {input_file} -> {output_file} "
+            f"on device {job.device} "
+            f"({time.strftime('%Y-%m-%d %H:%M:%S')}) ===\n",
+        )
+        self.watchdog.start_job(0)
+        self.watchdog_timer.start()
+        self.pause_button.setText("Pause")
+        plan = functools.partial(
+            self.plan_job, job, v2x_path, ffmpeg, ffprobe, input_file, output_file
+        )
+        self.runner.start([("Preparing", plan, None)], env_map, log_path=job.log_path)
+
+        if self.staging:
+            upcoming = self.urgent_queue + self.file_queue
+            count = self.settings.value("scratch-prefetch", 2, type=int)
+            self.staging.prefetch([j.input_file for j in upcoming[:count]])
+
+    def plan_job(self, job, v2x_path, ffmpeg, ffprobe, input_file, output_file, runner):
+        """The first stage of every job: probes the source, picks the encoder
+        and returns the stages that do the work. Runs on the stage thread."""
+        spec = job.spec
+        info = probe_video(ffprobe, input_file, runner=runner)
+        job.source_info = info
+        job.total_frames = info["frames"] if info else 0
+
+        job.encoder, job.encoder_opts, note = self.encoder_selector.select(
+            ffmpeg,
+            spec.encoder,
+            spec.encoder_opts,
+            exclude=job.excluded_encoders,
+            runner=runner,
+        )
+        message = f"Encoder: {job.encoder or 'Video2X default'}"
+        if note:
+            message += f" ({note})"
+        job.log(message)
+        runner.log(message + "\n")
+
+        def make_scratch_dir():
+            scratch_dir = tempfile.mkdtemp(
+                prefix=".c2x-", dir=pathlib.Path(output_file).parent
+            )
+            runner.scratch_dirs.append(scratch_dir)
+            return scratch_dir
+
+        stream_maps = None
+        video_output = output_file
+        if spec.stream_passthrough:
+            stream_maps, skipped = passthrough_maps(
+                ffprobe, input_file, output_file, runner
+            )
+            if skipped:
+                runner.log(
+                    f"Warning: {skipped} subtitle/attachment stream(s) can't be "
+                    f"copied into {pathlib.Path(output_file).suffix} and are left out\n"
                 )
+            video_output = str(
+                pathlib.Path(make_scratch_dir())
+                / f"video{pathlib.Path(output_file).suffix}"
+            )
 
-            encoder = self.settings.value("ffmpeg-encoder", "")
-            if encoder:
-                command_args.extend(["-c", encoder])
+        if job.mode == 0:
+            stages = self.upscale_stages(
+                job,
+                runner,
+                v2x_path,
+                ffmpeg,
+                ffprobe,
+                input_file,
+                output_file,
+                video_output,
+                stream_maps,
+                make_scratch_dir,
+            )
+        elif job.mode == 2:
+            intermediate = str(pathlib.Path(make_scratch_dir()) / "intermediate.mkv")
+            scale = spec.scale
+            factor = spec.factor
+            first, second = [
+                0 if step == "upscale" else 1
+                for step in plan_chain_order(scale, factor)
+            ]
+            labels = {0: "Upscaling", 1: "Interpolating"}
+            runner.log(f"Stage order: {labels[first]} then {labels[second]}\n")
+            stages = [
+                (
+                    labels[first],
+                    v2x_path,
+                    self.video2x_args(
+                        job,
+                        input_file,
+                        intermediate,
+                        first,
+                        lossless=True,
+                        scale=scale,
+                        factor=factor,
+                    ),
+                ),
+                (
+                    labels[second],
+                    v2x_path,
+                    self.video2x_args(
+                        job,
+                        intermediate,
+                        video_output,
+                        second,
+                        scale=scale,
+                        factor=factor,
+                    ),
+                ),
+            ]
+        else:
+            stages = [
+                (
+                    "Processing",
+                    v2x_path,
+                    self.video2x_args(job, input_file, video_output, job.mode),
+                )
+            ]
+
+        if video_output != output_file and stages[-1][1] == v2x_path:
+            stages.append(
+                (
+                    "Copying source streams",
+                    ffmpeg,
+                    remux_args(video_output, input_file, output_file, stream_maps),
+                )
+            )
+        return stages
+
+    def halt_batch(self, job):
+        """Stops starting jobs after a setup error, putting job back in front."""
+        job.status = "queued"
+        (self.urgent_queue if job.urgent else self.file_queue).insert(0, job)
+        if self.manifest_entries is not None:
+            self.manifest_timer.stop()
+            self.manifest_entries = None
+            self.add_output_text("--- Stopped reading manifest ---\n")
+        if self.can_resume_preempted():
+            # Let the frozen job finish instead of leaving it stopped.
+            self.resume_preempted()
+            return
+        self.set_processing_state(False)
+
+    def upscale_stages(
+        self,
+        job,
+        runner,
+        v2x_path,
+        ffmpeg,
+        ffprobe,
+        input_file,
+        output_file,
+        video_output,
+        stream_maps,
+        make_scratch_dir,
+    ):
+        spec = job.spec
+        final_args = encoder_args(job.encoder, job.encoder_opts)
+
+        scale = None
+        resize = None
+        if spec.target_width and spec.target_height:
+            info = job.source_info
+            if not info or not info["width"] or not info["height"]:
+                raise InputError(f"Could not probe '{input_file}'")
+
+            target_width = spec.target_width
+            target_height = spec.target_height
+            scale = target_scale(
+                info["width"], info["height"], target_width, target_height
+            )
+            upscaled_size = (info["width"] * scale, info["height"] * scale)
+            if upscaled_size != (target_width, target_height):
+                resize = resize_filter(target_width, target_height)
+                final_args = ["-vf", resize] + final_args
+
+            runner.log(
+                f"Target {target_width}x{target_height}: "
+                f"{info['width']}x{info['height']} upscaled {scale}x"
+                f"{', resized in the final encode' if resize else ''}\n"
+            )
 
-            encoder_opts = self.settings.value("ffmpeg-opts", "")
-            if encoder_opts:
-                for opt in encoder_opts.split(","):
-                    command_args.extend(["-e", opt.strip()])
+        if spec.dedup:
+            dedup = DuplicateFramePass(ffmpeg, ffprobe, input_file, make_scratch_dir())
+            restore = functools.partial(
+                dedup.restore,
+                output=output_file,
+                encode_args=final_args,
+                stream_maps=stream_maps,
+            )
+            restore.reports_progress = True
+            return [
+                ("Removing duplicate frames", ffmpeg, dedup.decimate_args()),
+                ("Counting unique frames", dedup.analyse, None),
+                (
+                    "Upscaling unique frames",
+                    v2x_path,
+                    self.video2x_args(
+                        job,
+                        dedup.unique_path,
+                        dedup.upscaled_path,
+                        0,
+                        lossless=True,
+                        scale=scale,
+                    ),
+                ),
+                ("Restoring timing", restore, None),
+            ]
+
+        if resize:
+            upscaled = str(pathlib.Path(make_scratch_dir()) / "upscaled.mkv")
+            return [
+                (
+                    "Upscaling",
+                    v2x_path,
+                    self.video2x_args(
+                        job, input_file, upscaled, 0, lossless=True, scale=scale
+                    ),
+                ),
+                (
+                    "Resizing",
+                    ffmpeg,
+                    final_encode_args(
+                        upscaled, input_file, output_file, final_args, stream_maps
+                    ),
+                ),
+            ]
+
+        return [
+            (
+                "Processing",
+                v2x_path,
+                self.video2x_args(job, input_file, video_output, 0, scale=scale),
+            )
+        ]
+
+    def video2x_args(
+        self,
+        job,
+        input_file,
+        output_file,
+        mode,
+        lossless=False,
+        scale=None,
+        factor=None,
+    ):
+        spec = job.spec
+        command_args = ["-i", input_file, "-o", output_file]
 
-        except Exception as e:
-            self.add_output_text(f"Error building command: {e}\n")
-            self.set_processing_state(False)
-            return
+        if mode == 0:
+            if scale is None:
+                scale = spec.scale
+
+            command_args.extend(["-p", spec.model])
+            if spec.model == "realcugan":
+                command_args.extend(["--realcugan-model", spec.realcugan_model])
+            command_args.extend(["-s", str(scale)])
+            if spec.backend == "gpu":
+                command_args.extend(["-d", job.device])
+
+        elif mode == 1:
+            rife_model_name = spec.rife_model
+            rife_factor = factor or spec.factor
+
+            if not rife_model_name:
+                raise ValueError("RIFE model name not set in settings.")
+
+            command_args.extend(
+                [
+                    "-p",
+                    "rife",
+                    "--rife-model",
+                    rife_model_name,
+                    "-m",
+                    str(rife_factor),
+                    "-d",
+                    job.device,
+                ]
+            )
+
+        if lossless:
+            command_args.extend(["-c", "ffv1"])
+            return command_args
 
+        encoder = job.encoder
+        if encoder:
+            command_args.extend(["-c", encoder])
+
+        encoder_opts = job.encoder_opts
+        if encoder_opts:
+            for opt in encoder_opts.split(","):
+                command_args.extend(["-e", opt.strip()])
+
+        return command_args
+
+    def build_environment(self, ffmpeg_path):
         env = QProcess.systemEnvironment()
         env_map = {
             item.split("=", 1)[0]: item.split("=", 1)[1] for item in env if "=" in item
@@ -955,23 +3972,10 @@ class MainWindow(QMainWindow):
         env_map["__NV_PRIME_RENDER_OFFLOAD"] = "1"
         env_map["__GLX_VENDOR_LIBRARY_NAME"] = "nvidia"
 
-        ffmpeg_path = self._find_ffmpeg_path()
         if ffmpeg_path:
             env_map["PATH"] = f"{ffmpeg_path}:{env_map.get('PATH', '')}"
 
-        process_env = self.process.processEnvironment()
-        for key, value in env_map.items():
-            process_env.insert(key, value)
-        self.process.setProcessEnvironment(process_env)
-
-        self.add_output_text(f"Command: {v2x_path} {' '.join(command_args)}\n")
-
-        try:
-            self.process.start(v2x_path, command_args)
-
-        except Exception as e:
-            self.add_output_text(f"Failed to start process: {e}\n")
-            self.set_processing_state(False)
+        return env_map
 
 
 if __name__ == "__main__":
@@ -979,6 +3983,8 @@ if __name__ == "__main__":
     QCoreApplication.setApplicationName("VideoEnhancer")
 
     app = QApplication(sys.argv)
+    if pyside_leaks_references():
+        sys.exit(PYSIDE_LEAK_ERROR)
     app.setStyleSheet(APP_STYLESHEET)
 
     settings = QSettings()
@@ -1003,4 +4009,6 @@ if __name__ == "__main__":
 
     win = MainWindow(settings=settings)
     win.show()
+    if "--manifest" in sys.argv[1:-1]:
+        win.run_manifest(sys.argv[sys.argv.index("--manifest") + 1])
     sys.exit(app.exec())